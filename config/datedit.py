@@ -1,13 +1,17 @@
+import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+from filesdat import FilesDat
 
 class FileEditorApp:
     def __init__(self, root, input_filepath="files.dat"):
         self.root = root
         self.root.title("ASCII Data Editor")
         self.input_filepath = input_filepath
-        self.files_data = {}
+        self.files_data = None
         self.current_file = None
 
         self.create_widgets()
@@ -60,29 +64,9 @@ class FileEditorApp:
         self.edit_menu.add_command(label="Paste", command=lambda: self.text_editor.event_generate("<<Paste>>"))
 
     def load_files_data(self):
-        self.files_data = {}
-        current_filename = None
-        current_content = []
-
+        # Only the section index is loaded; contents are read on selection
         try:
-            with open(self.input_filepath, 'r') as f:
-                for line in f:
-                    if line.startswith('/*') and not line.startswith('*/'):
-                        if current_filename:
-                            self.files_data[current_filename] = "".join(current_content)
-                        current_filename = line[2:].strip()
-                        current_content = []
-                    elif line.startswith('*/'):
-                        if current_filename:
-                            self.files_data[current_filename] = "".join(current_content)
-                        current_filename = None
-                        current_content = []
-                    else:
-                        if current_filename:
-                            current_content.append(line)
-                # Add the last file if the file ends without a '*/'
-                if current_filename:
-                    self.files_data[current_filename] = "".join(current_content)
+            self.files_data = FilesDat(self.input_filepath)
         except FileNotFoundError:
             messagebox.showerror("Error", f"Input file '{self.input_filepath}' not found.")
             self.root.quit()
@@ -92,7 +76,9 @@ class FileEditorApp:
 
     def populate_file_list(self):
         self.file_list.delete(0, tk.END)
-        for filename in self.files_data.keys():
+        if self.files_data is None:
+            return
+        for filename in self.files_data.names():
             self.file_list.insert(tk.END, filename)
 
     def on_file_select(self, event):
@@ -100,7 +86,7 @@ class FileEditorApp:
         if selected_index:
             self.current_file = self.file_list.get(selected_index[0])
             self.text_editor.delete(1.0, tk.END)
-            self.text_editor.insert(tk.END, self.files_data[self.current_file])
+            self.text_editor.insert(tk.END, self.files_data.read(self.current_file).decode("utf-8"))
 
     def open_file(self):
         filepath = filedialog.askopenfilename(
@@ -116,20 +102,14 @@ class FileEditorApp:
             self.current_file = None # Reset current file selection
 
     def save_changes(self):
-        if self.current_file:
-            self.files_data[self.current_file] = self.text_editor.get(1.0, tk.END)
-        else:
+        if not self.current_file:
             messagebox.showinfo("No File Selected", "Please select a file to save its changes.")
             return
 
         try:
-            with open(self.input_filepath, 'w') as f:
-                for filename, content in self.files_data.items():
-                    f.write(f"/*{filename}\n")
-                    f.write(content)
-                    if not content.endswith('\n'): # Ensure content ends with a newline before closing comment
-                        f.write('\n')
-                    f.write("*/\n\n")
+            # Tk always adds one trailing newline of its own
+            content = self.text_editor.get(1.0, tk.END)[:-1]
+            self.files_data.write(self.current_file, content.encode("utf-8"))
             messagebox.showinfo("Save Successful", "Changes saved to files.dat!")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while saving: {e}")
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+"""
+BSP Inspector
+
+Memory-mapped reader for compiled Quake maps (BSP29) that reports what
+matters for performance without starting the engine:
+
+- the size and entry count of every lump
+- counts checked against the engine's limits (bspfile.h)
+- visibility data: compressed size, uncompressed size and ratio
+- lighting: lightmap bytes, lit faces, light styles
+- r_speeds-style estimates from the PVS: how many leafs and surfaces
+  are potentially visible from each leaf (surfaces are counted once per
+  leaf that marks them, so this is an upper bound on world polys drawn)
+
+Reports are JSON, and any limit or budget overrun is listed under
+"problems", so a build can stop on a map that won't load or is too heavy.
+
+Usage:
+    bspfile.py [--budget name=value ...] map.bsp ...
+"""
+
+import sys
+import os
+import argparse
+import json
+import mmap
+import struct
+
+# A friendly check for the optional NumPy library.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BSP_VERSION = 29
+BSP_HEADER = struct.Struct("<l30l")
+
+LUMP_NAMES = (
+    "entities", "planes", "textures", "vertexes", "visibility", "nodes", "texinfo",
+    "faces", "lighting", "clipnodes", "leafs", "marksurfaces", "edges", "surfedges", "models",
+)
+
+# On-disk record sizes of the lumps that are arrays (bspfile.h)
+LUMP_RECORD_SIZES = {
+    "planes": 20, "vertexes": 12, "nodes": 24, "texinfo": 40, "faces": 20,
+    "clipnodes": 8, "leafs": 28, "marksurfaces": 2, "edges": 4, "surfedges": 4, "models": 64,
+}
+
+DFACE = struct.Struct("<hhlhh4Bl")
+DLEAF = struct.Struct("<ll6h2H4B")
+DMODEL = struct.Struct("<9f7l")
+
+# Engine limits (bspfile.h); counts are entries, the rest bytes
+LIMITS = {
+    "models": 256,
+    "entities": 1024,
+    "entstring": 65536,
+    "planes": 32767,
+    "nodes": 32767,
+    "clipnodes": 32767,
+    "leafs": 8192,
+    "vertexes": 65535,
+    "faces": 65535,
+    "marksurfaces": 65535,
+    "texinfo": 4096,
+    "edges": 256000,
+    "surfedges": 512000,
+    "textures": 512,
+    "miptex": 0x200000,
+    "lighting": 0x100000,
+    "visibility": 0x100000,
+}
+
+class BSPFile:
+    """
+    A memory-mapped, read-only BSP29 map.
+
+    Raises:
+        ValueError: If the file is not a well-formed BSP29 map.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size < BSP_HEADER.size:
+                raise ValueError(f"{filename} is too small to be a BSP file")
+
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        header = BSP_HEADER.unpack_from(self._map, 0)
+        if header[0] != BSP_VERSION:
+            raise ValueError(f"{self.filename} is BSP version {header[0]}, not {BSP_VERSION}")
+
+        self.lumps = {}
+        for i, name in enumerate(LUMP_NAMES):
+            offset, length = header[1 + i * 2], header[2 + i * 2]
+            if offset < 0 or length < 0 or offset + length > self.size:
+                raise ValueError(f"{self.filename}: lump '{name}' points outside the file")
+            record = LUMP_RECORD_SIZES.get(name)
+            if record and length % record:
+                raise ValueError(f"{self.filename}: lump '{name}' has a funny size ({length})")
+            self.lumps[name] = (offset, length)
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lump(self, name):
+        """
+        Returns a lump's raw bytes.
+        """
+        offset, length = self.lumps[name]
+        return self._map[offset:offset + length]
+
+    def count(self, name):
+        """
+        Returns the number of records in an array lump.
+        """
+        return self.lumps[name][1] // LUMP_RECORD_SIZES[name]
+
+    def records(self, name, layout):
+        offset, length = self.lumps[name]
+        return layout.iter_unpack(self._map[offset:offset + length])
+
+    def entity_string(self):
+        return self.lump("entities").split(b"\x00", 1)[0].decode("latin-1")
+
+    def texture_count(self):
+        offset, length = self.lumps["textures"]
+        return struct.unpack_from("<l", self._map, offset)[0] if length >= 4 else 0
+
+    def decompress_vis(self, visofs, row_bytes):
+        """
+        Expands one leaf's run-length encoded PVS row (zero bytes are
+        followed by a repeat count).
+        """
+        if visofs < 0:
+            return b"\xff" * row_bytes  # no vis data: everything is visible
+
+        offset, length = self.lumps["visibility"]
+        data = self._map
+        pos = offset + visofs
+        end = offset + length
+        row = bytearray()
+        while len(row) < row_bytes and pos < end:
+            zero = data.find(b"\x00", pos, end)
+            literal_end = min(end if zero < 0 else zero, pos + row_bytes - len(row))
+            row += data[pos:literal_end]
+            pos = literal_end
+            if pos < end and data[pos] == 0 and len(row) < row_bytes:
+                row.extend(bytes(data[pos + 1] if pos + 1 < end else 0))
+                pos += 2
+        return bytes(row[:row_bytes]).ljust(row_bytes, b"\x00")
+
+    def vis_estimates(self):
+        """
+        Returns PVS statistics: uncompressed size, and the max/average
+        number of visible leafs and marked surfaces over all leafs.
+        """
+        leafs = list(self.records("leafs", DLEAF))
+        models = list(self.records("models", DMODEL))
+        visleafs = models[0][13] if models else max(len(leafs) - 1, 0)
+        row_bytes = (visleafs + 7) >> 3
+        uncompressed = row_bytes * visleafs
+        if not visleafs:
+            return uncompressed, {}
+
+        # Leaf 0 is the shared solid leaf; bit i of a row is leaf i + 1
+        surfaces = [leaf[9] for leaf in leafs[1:visleafs + 1]]
+        surfaces += [0] * (row_bytes * 8 - len(surfaces))
+        rows = [self.decompress_vis(leaf[1], row_bytes) for leaf in leafs[1:visleafs + 1]]
+        if visleafs % 8:
+            # Clear the padding bits past the last leaf
+            last = (1 << (visleafs % 8)) - 1
+            rows = [row[:-1] + bytes((row[-1] & last,)) for row in rows]
+
+        if np is not None:
+            bits = np.unpackbits(np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(visleafs, row_bytes),
+                                 axis=1, bitorder="little")
+            leaf_counts = bits.sum(axis=1)
+            surface_counts = bits @ np.array(surfaces, dtype=np.int64)
+            leaf_counts, surface_counts = leaf_counts.tolist(), surface_counts.tolist()
+        else:
+            # Per byte position, the leaf and surface totals for every byte value
+            popcount = [bin(v).count("1") for v in range(256)]
+            tables = []
+            for pos in range(row_bytes):
+                group = surfaces[pos * 8:pos * 8 + 8]
+                tables.append([sum(group[bit] for bit in range(8) if v >> bit & 1) for v in range(256)])
+            leaf_counts = [sum(popcount[v] for v in row) for row in rows]
+            surface_counts = [sum(table[v] for table, v in zip(tables, row)) for row in rows]
+
+        return uncompressed, {
+            "pvs_leafs_max": max(leaf_counts),
+            "pvs_leafs_avg": round(sum(leaf_counts) / visleafs, 1),
+            "pvs_surfaces_max": max(surface_counts),
+            "pvs_surfaces_avg": round(sum(surface_counts) / visleafs, 1),
+        }
+
+def inspect_bsp(filename, budgets=None):
+    """
+    Builds the JSON-friendly report for one map.
+
+    Args:
+        filename: The .bsp file.
+        budgets: Optional {estimate or count name: maximum} project budgets,
+            checked alongside the engine limits.
+    """
+    with BSPFile(filename) as bsp:
+        counts = {name: bsp.count(name) for name in LUMP_RECORD_SIZES}
+        counts["entities"] = bsp.entity_string().count("{")
+        counts["textures"] = bsp.texture_count()
+
+        faces = list(bsp.records("faces", DFACE))
+        lit_faces = sum(1 for face in faces if face[9] >= 0)
+        styles = sorted({style for face in faces for style in face[5:9] if style != 255})
+
+        vis_bytes = bsp.lumps["visibility"][1]
+        uncompressed, estimates = bsp.vis_estimates()
+
+        sizes = {
+            "entstring": bsp.lumps["entities"][1],
+            "miptex": bsp.lumps["textures"][1],
+            "lighting": bsp.lumps["lighting"][1],
+            "visibility": vis_bytes,
+        }
+
+        report = {
+            "file": filename,
+            "size": bsp.size,
+            "lumps": {name: {"offset": offset, "length": length, "count": counts.get(name)}
+                      for name, (offset, length) in bsp.lumps.items()},
+            "limits": {},
+            "visibility": {
+                "bytes": vis_bytes,
+                "uncompressed_bytes": uncompressed,
+                "ratio": round(uncompressed / vis_bytes, 2) if vis_bytes else None,
+                "visleafs": next(iter(bsp.records("models", DMODEL)), [0] * 16)[13],
+            },
+            "lighting": {"bytes": sizes["lighting"], "lit_faces": lit_faces, "styles": styles},
+            "estimates": estimates,
+            "problems": [],
+        }
+
+    for name, limit in LIMITS.items():
+        value = counts[name] if name in counts else sizes[name]
+        report["limits"][name] = {"value": value, "limit": limit, "percent": round(100 * value / limit, 1)}
+        if value > limit:
+            report["problems"].append(f"{name}: {value} exceeds the engine limit of {limit}")
+
+    values = {**counts, **sizes, **estimates}
+    for name, budget in (budgets or {}).items():
+        if name not in values:
+            report["problems"].append(f"unknown budget '{name}'")
+        elif values[name] > budget:
+            report["problems"].append(f"{name}: {values[name]} is over the budget of {budget}")
+
+    return report
+
+def parse_budget(text):
+    name, _, value = text.partition("=")
+    try:
+        value = float(value)
+        return name, int(value) if value.is_integer() else value
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"budget must look like name=value, not '{text}'")
+
+def main():
+    """
+    Main function to parse command-line arguments and print the reports.
+    """
+    parser = argparse.ArgumentParser(
+        description="Reports lump sizes, engine limits and PVS estimates for BSP29 maps, as JSON."
+    )
+    parser.add_argument('maps', nargs='+', help='.bsp files.')
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help='A project budget, e.g. pvs_surfaces_max=2000 (repeatable).')
+
+    args = parser.parse_args()
+
+    reports = []
+    for path in args.maps:
+        try:
+            reports.append(inspect_bsp(path, dict(args.budget)))
+        except (IOError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    print(json.dumps(reports, indent=1))
+    if any(report["problems"] for report in reports):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
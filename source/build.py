@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+
+"""
+QuakeKit Build Driver
+
+Runs the same pipeline as the Makefile 'all' target, but as a dependency
+graph instead of a fixed sequence. Steps whose inputs are ready run at the
+same time on a process pool: qcc, gfx.wad, the colormap/pop lumps and
+every map's qbsp -> light -> vis chain all build side by side.
+
+Each step reports its wall time, and a summary is printed at the end.
+
+Usage:
+    python source/build.py [-j N] [--maps bigroom ...] [step ...]
+
+Naming steps builds only those steps and whatever they depend on.
+"""
+
+import sys
+import os
+import argparse
+import glob
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+
+from bspfile import inspect_bsp, parse_budget
+from buildcache import BuildCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, cached
+from demofile import compact_demo
+from filesdat import FilesDat
+from mapfile import MapFile, write_map_wads
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, "source")
+
+# Defaults mirror the Makefile variables
+BINPATH = "_pak0"
+BSP_FLAGS = ""
+LIGHT_FLAGS = "-extra4"
+VIS_FLAGS = "-level 4"
+QCC_FLAGS = ""
+
+# qbsp/light/vis flags per build profile: full quality for releases, and
+# quick compiles for iterating on maps
+PROFILES = {
+    "release": (BSP_FLAGS, LIGHT_FLAGS, VIS_FLAGS),
+    "preview": ("", "", "-fast"),
+}
+
+class BuildError(Exception):
+    pass
+
+class Step:
+    """
+    One node of the build graph.
+
+    Args:
+        name: Unique step name, e.g. "qcc" or "map:bigroom:light".
+        deps: Names of the steps that must finish first.
+        actions: Picklable callables run in order inside a worker process.
+            Each returns a string of output (or None).
+    """
+
+    def __init__(self, name, deps, actions):
+        self.name = name
+        self.deps = list(deps)
+        self.actions = list(actions)
+
+# --- Actions (module level so they can be sent to worker processes) ---
+
+def run(argv, cwd=ROOT):
+    """
+    Runs an external command and returns its combined output.
+    """
+    try:
+        proc = subprocess.run(argv, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except FileNotFoundError:
+        raise BuildError(f"'{argv[0]}' was not found; is it on your PATH (or in bin/)?")
+
+    output = proc.stdout.decode(errors="replace")
+    if proc.returncode != 0:
+        raise BuildError(f"{' '.join(argv)} exited with status {proc.returncode}\n{output}")
+    return output
+
+def run_python(script, args, cwd=ROOT):
+    """
+    Runs one of the project's Python tools from source/ with this interpreter.
+    """
+    return run([sys.executable, os.path.join(SOURCE, script)] + list(args), cwd=cwd)
+
+def make_dirs(*paths):
+    for path in paths:
+        os.makedirs(path, exist_ok=True)
+
+def copy_tree(src, dest, exclude=()):
+    """
+    Copies a directory tree over dest, skipping top-level names in exclude.
+    """
+    if not os.path.isdir(src):
+        return f"{src} does not exist, skipping"
+
+    top = os.path.abspath(src)
+    ignore = lambda d, names: [n for n in names if n in exclude and os.path.abspath(d) == top]
+    shutil.copytree(src, dest, ignore=ignore, dirs_exist_ok=True)
+
+def copy_glob(pattern, dest, move=False, recursive=False):
+    """
+    Copies (or moves) every file matching pattern into dest.
+    """
+    found = sorted(glob.glob(pattern, recursive=recursive))
+    os.makedirs(dest, exist_ok=True)
+    for path in found:
+        if move:
+            shutil.move(path, os.path.join(dest, os.path.basename(path)))
+        else:
+            shutil.copy2(path, dest)
+    return f"{'Moved' if move else 'Copied'} {len(found)} files to {dest}"
+
+def copy_demos(files_dat, demodir, dest):
+    lines = []
+    for demo in FilesDat(files_dat).startdemos():
+        path = os.path.join(demodir, demo + ".dem")
+        if os.path.isfile(path):
+            before, after = compact_demo(path, os.path.join(dest, demo + ".dem"))
+            lines.append(f"Copying {demo}.dem ({before} -> {after} bytes)...")
+        else:
+            lines.append(f"Warning: {demo}.dem not found in demos/")
+    return "\n".join(lines)
+
+def tool_path(tool):
+    """
+    Resolves a tool to the file its cache key is taken from: a script in
+    source/, or an executable on the PATH.
+    """
+    if tool.endswith(".py"):
+        return os.path.join(SOURCE, tool)
+
+    path = shutil.which(tool)
+    if path is None:
+        raise BuildError(f"'{tool}' was not found; is it on your PATH (or in bin/)?")
+    return path
+
+def cached_step(cache_dir, cache_size, tools, inputs, outdir, names, actions):
+    """
+    Runs actions to produce outdir/names, unless the build cache already
+    holds the outputs for these tools and inputs.
+
+    Args:
+        cache_dir: Cache directory, or None to disable caching.
+        cache_size: Cache size limit in bytes.
+        tools: Tool script names (in source/) or executables on the PATH.
+        inputs: Input file paths.
+        outdir: Where the outputs end up.
+        names: Output file names.
+        actions: The uncached actions.
+    """
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+
+    def produce():
+        return "\n".join(text.rstrip() for text in (action() for action in actions) if text)
+
+    hit, output = cached(cache, [tool_path(tool) for tool in tools], inputs, outdir, names, produce)
+    if hit:
+        return f"{', '.join(names)} restored from cache"
+    return output
+
+def check_bsp(bsp, budgets):
+    """
+    Fails the build if a compiled map is over an engine limit or budget.
+    """
+    report = inspect_bsp(bsp, budgets)
+    if report["problems"]:
+        raise BuildError(f"{os.path.basename(bsp)}: " + "; ".join(report["problems"]))
+    estimates = report["estimates"]
+    return (f"{os.path.basename(bsp)}: {report['size']} bytes, "
+            f"{estimates.get('pvs_surfaces_max', 0)} surfaces in the largest PVS")
+
+def compile_map(cache_dir, cache_size, source, bsp, wadpath, bsp_flags, light_flags, vis_flags, budgets=None):
+    """
+    Runs qbsp, light and vis for one map, unless the build cache already has
+    a BSP for the same map source, textures, tools and flags. Either way the
+    BSP is then checked against the engine limits and any budgets.
+
+    qbsp is pointed at per-map copies of the texture WADs holding only the
+    textures the map uses, which are also what the cache key hashes, so
+    editing a texture a map doesn't use doesn't recompile it.
+    """
+    outdir, bsp_name = os.path.split(bsp)
+    lit_name = os.path.splitext(bsp_name)[0] + ".lit"
+    tools = ["qbsp", "light", "vis"]
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+
+    with tempfile.TemporaryDirectory(prefix="wads-") as map_wadpath:
+        _, missing = write_map_wads(MapFile(source), wadpath, map_wadpath)
+        wads = sorted(os.path.join(map_wadpath, name) for name in os.listdir(map_wadpath))
+        output = [f"Warning: texture '{name}' is not in any WAD in {wadpath}" for name in missing]
+
+        # Clear the last compile first, so restoring a BSP without a .lit
+        # doesn't leave an older .lit next to it
+        for name in (bsp_name, lit_name):
+            if os.path.exists(os.path.join(outdir, name)):
+                os.remove(os.path.join(outdir, name))
+
+        if cache is not None:
+            key = cache.key([tool_path(tool) for tool in tools], [source] + wads,
+                            [bsp_flags, light_flags, vis_flags] + [os.path.basename(w) for w in wads])
+            # light only writes a .lit for colored lights
+            if cache.get(key, outdir, [bsp_name, lit_name]) or cache.get(key, outdir, [bsp_name]):
+                return "\n".join(output + [f"{bsp_name} restored from cache", check_bsp(bsp, budgets)])
+
+        output += [
+            run(["qbsp"] + bsp_flags.split() + ["-wadpath", map_wadpath, source, bsp]),
+            run(["light"] + light_flags.split() + [bsp]),
+            run(["vis"] + vis_flags.split() + [bsp]),
+        ]
+
+    if cache is not None:
+        names = [name for name in (bsp_name, lit_name) if os.path.exists(os.path.join(outdir, name))]
+        cache.put(key, outdir, names)
+    output.append(check_bsp(bsp, budgets))
+    return "\n".join(text.rstrip() for text in output if text)
+
+def build_pak(rootdir, pakfilename):
+    return run_python("makepak.py", [rootdir, pakfilename])
+
+# --- Graph ---
+
+def map_names(requested=None):
+    """
+    Returns the maps to compile: the requested names, or every maps/*.map.
+    """
+    if requested:
+        return list(requested)
+    return sorted(os.path.splitext(os.path.basename(p))[0]
+                  for p in glob.glob(os.path.join(ROOT, "maps", "*.map")))
+
+def build_graph(binpath=BINPATH, maps=None, bsp_flags=BSP_FLAGS,
+                light_flags=LIGHT_FLAGS, vis_flags=VIS_FLAGS, pakfilename="pak0.pak",
+                cache_dir=DEFAULT_CACHE_DIR, cache_size=DEFAULT_MAX_BYTES, budgets=None,
+                qcc_flags=QCC_FLAGS):
+    """
+    Builds the step graph for a full project build. The generated lumps
+    (palette, colormap, pop and gfx) and the compiled maps go through the
+    build cache unless cache_dir is None. Compiled maps must stay within
+    the engine limits and the given budgets ({name: maximum}, see bspfile.py).
+
+    Returns:
+        A dict of step name -> Step.
+    """
+    out = os.path.join(ROOT, binpath)
+    gfx = os.path.join(out, "gfx")
+    files_dat = os.path.join(ROOT, "config", "files.dat")
+    wadpath = os.path.join(ROOT, "textures")
+    palette_tga = os.path.join(ROOT, "graphics", "PALETTE", "palette.tga")
+    cache = lambda *args: partial(cached_step, cache_dir, cache_size, *args)
+
+    gfx_lumps = []
+    tga_files = sorted(glob.glob(os.path.join(ROOT, "graphics", "*.tga")))
+    if tga_files:
+        lmp_names = [os.path.splitext(os.path.basename(path))[0] + ".lmp" for path in tga_files]
+        gfx_lumps = [cache(["tga2lmp"], tga_files, gfx, lmp_names, [
+            partial(run, ["tga2lmp"] + tga_files, cwd=os.path.join(ROOT, "graphics")),
+            partial(copy_glob, os.path.join(ROOT, "graphics", "*.lmp"), gfx, move=True),
+        ])]
+
+    pics = sorted(glob.glob(os.path.join(ROOT, "gfx-wad", "*.png")))
+    cube = ["--cube", os.path.join(cache_dir, "palette.cube")] if cache_dir else []
+
+    progs = [
+        partial(copy_glob, os.path.join(ROOT, "models", "**", "*.spr"), os.path.join(out, "progs"), recursive=True),
+        partial(copy_glob, os.path.join(ROOT, "models", "**", "*.mdl"), os.path.join(out, "progs"), recursive=True),
+    ]
+    if os.path.isdir(os.path.join(ROOT, "models", "spr_flame1")):
+        progs.insert(0, partial(run, ["tga2spr", "flame.qc"], cwd=os.path.join(ROOT, "models", "spr_flame1")))
+
+    # Raw sounds listed in sound/_RAW/sounds.txt are converted before the
+    # sound tree is copied
+    sounds_txt = os.path.join(ROOT, "sound", "_RAW", "sounds.txt")
+    tree_deps = ["setup"]
+    sound_steps = []
+    if os.path.isfile(sounds_txt):
+        sound_cache = ["--cache-dir", cache_dir] if cache_dir else ["--no-cache"]
+        sound_steps.append(Step("sounds", [], [
+            partial(run_python, "qonverter.py", sound_cache + [sounds_txt]),
+        ]))
+        tree_deps.append("sounds")
+
+    steps = sound_steps + [
+        Step("setup", [], [partial(make_dirs, out)]),
+        Step("tree", tree_deps, [
+            partial(make_dirs, gfx, os.path.join(out, "maps"), os.path.join(out, "progs")),
+            partial(copy_tree, os.path.join(ROOT, "sound"), os.path.join(out, "sound"), exclude=("_RAW",)),
+            partial(run_python, "wavopt.py", [os.path.join(out, "sound")]),
+        ]),
+        Step("bincopy", ["setup"], [
+            partial(copy_glob, os.path.join(ROOT, "endscreen", "*.bin"), out),
+            partial(run_python, "cfgcheck.py", ["check", files_dat]),
+            partial(run_python, "file_splitter.py", ["--minify", files_dat], cwd=out),
+        ]),
+        Step("copy_demos", ["setup"], [
+            partial(copy_demos, files_dat, os.path.join(ROOT, "demos"), out),
+        ]),
+        Step("qcc", ["setup"], [
+            partial(run_python, "qccbuild.py", ["-o", os.path.join(out, "progs.dat"), f"--flags={qcc_flags}"]
+                    + (["--cache-dir", cache_dir] if cache_dir else ["--no-cache"])
+                    + [os.path.join(ROOT, "qcc-src", "progs.src")]),
+        ]),
+        Step("gfx-wad", ["palette"], [cache(["picwad.py", "palindex.py", "palette.py", "wad2.py"],
+                                            [os.path.join(gfx, "palette.lmp")] + pics, out, ["gfx.wad"], [
+            partial(run_python, "picwad.py", ["-p", os.path.join(gfx, "palette.lmp"), "-o",
+                                              os.path.join(out, "gfx.wad")] + cube + pics),
+        ])]),
+        Step("palette", ["tree"], [cache(["palette.py"], [palette_tga], gfx, ["palette.lmp"], [
+            partial(run_python, "palette.py", ["convert", palette_tga, os.path.join(gfx, "palette.lmp")]),
+        ])]),
+        Step("colormap", ["palette"], [cache(["colorgen.py", "palindex.py", "palette.py"], [os.path.join(gfx, "palette.lmp")],
+                                             gfx, ["colormap.lmp"], [
+            partial(run_python, "colorgen.py", ["palette.lmp"], cwd=gfx),
+        ])]),
+        Step("pop", ["tree"], [cache(["getpop.py"], [], gfx, ["pop.lmp"], [
+            partial(run_python, "getpop.py", [], cwd=gfx),
+        ])]),
+        Step("music", ["tree"], [
+            partial(run_python, "music.py", ["-o", os.path.join(out, "music")]
+                    + (["--cache-dir", cache_dir] if cache_dir else ["--no-cache"])),
+        ]),
+        Step("gfx-lumps", ["tree"], gfx_lumps),
+        Step("progs", ["tree"], progs),
+    ]
+
+    # Source images in textures/src are compiled into a texture WAD for qbsp
+    map_deps = ["tree"]
+    texture_src = os.path.join(ROOT, "textures", "src")
+    if os.path.isdir(texture_src):
+        lit_cube = ["--cube", os.path.join(cache_dir, "palette-lit.cube")] if cache_dir else []
+        steps.append(Step("texwad", ["palette"], [
+            partial(run_python, "texwad.py", ["-p", os.path.join(gfx, "palette.lmp"), "-o",
+                                              os.path.join(wadpath, "textures.wad")] + lit_cube + [texture_src]),
+        ]))
+        map_deps.append("texwad")
+
+    # Each map compiles (qbsp -> light -> vis) as its own step, in parallel
+    # with the others, and is cached on its source, textures and flags
+    map_steps = []
+    for name in map_names(maps):
+        steps.append(Step(f"map:{name}", map_deps, [
+            partial(compile_map, cache_dir, cache_size, os.path.join(ROOT, "maps", name + ".map"),
+                    os.path.join(out, "maps", name + ".bsp"), wadpath, bsp_flags, light_flags, vis_flags,
+                    budgets),
+        ]))
+        map_steps.append(f"map:{name}")
+
+    steps.append(Step("map-lits", ["tree"] + map_steps, [
+        partial(copy_glob, os.path.join(ROOT, "maps", "**", "*.lit"), os.path.join(out, "maps"),
+                move=True, recursive=True),
+    ]))
+
+    steps.append(Step("pack", [s.name for s in steps], [
+        partial(build_pak, out, os.path.join(ROOT, pakfilename)),
+    ]))
+
+    return {step.name: step for step in steps}
+
+def select(graph, targets):
+    """
+    Narrows the graph to the target steps and everything they depend on.
+    """
+    wanted = {}
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name in wanted:
+            continue
+        if name not in graph:
+            raise BuildError(f"unknown step '{name}'")
+        wanted[name] = graph[name]
+        pending.extend(graph[name].deps)
+    return {name: step for name, step in graph.items() if name in wanted}
+
+# --- Scheduler ---
+
+def run_step(step):
+    """
+    Worker entry point: runs a step's actions and times them.
+
+    Returns:
+        (step name, seconds, output text)
+    """
+    start = time.perf_counter()
+    output = []
+    for action in step.actions:
+        text = action()
+        if text:
+            output.append(text.rstrip())
+    return step.name, time.perf_counter() - start, "\n".join(output)
+
+def execute(graph, jobs=None, log=print):
+    """
+    Runs a step graph, starting every step as soon as its dependencies
+    have finished. After a failure no new steps are started, but running
+    ones are allowed to finish.
+
+    Returns:
+        A dict of step name -> wall time in seconds for completed steps.
+
+    Raises:
+        BuildError: If any step failed.
+    """
+    remaining = {name: set(step.deps) for name, step in graph.items()}
+    timings = {}
+    failures = []
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while remaining or running:
+            if not failures:
+                for name in [n for n, deps in remaining.items() if not deps]:
+                    del remaining[name]
+                    running[pool.submit(run_step, graph[name])] = name
+                    log(f"--- {name}")
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    _, seconds, output = future.result()
+                except Exception as e:
+                    failures.append(name)
+                    log(f"!!! {name} failed: {e}")
+                    continue
+
+                timings[name] = seconds
+                if output:
+                    log(output)
+                log(f"+++ {name} ({seconds:.2f}s)")
+                for deps in remaining.values():
+                    deps.discard(name)
+
+    if failures:
+        raise BuildError(f"{len(failures)} step(s) failed: {', '.join(failures)}")
+    return timings
+
+def print_report(timings, wall):
+    print()
+    print("Step timings:")
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"  {seconds:8.2f}s  {name}")
+    print(f"  {sum(timings.values()):8.2f}s  total step time")
+    print(f"  {wall:8.2f}s  wall time")
+
+def main():
+    """
+    Main function to parse command-line arguments and run the build.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the project as a parallel dependency graph."
+    )
+    parser.add_argument('steps', nargs='*', help='Steps to build (default: pack, i.e. everything).')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='Worker processes (default: all cores).')
+    parser.add_argument('--binpath', default=BINPATH, help=f'Temp build directory (default: {BINPATH}).')
+    parser.add_argument('--maps', nargs='*', help='Maps to compile (default: every maps/*.map).')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='release',
+                        help='Map compile profile: full quality, or quick previews (default: release).')
+    parser.add_argument('--bsp-flags', help='Extra qbsp flags (overrides the profile).')
+    parser.add_argument('--light-flags', help=f'light flags (overrides the profile; release: "{LIGHT_FLAGS}").')
+    parser.add_argument('--vis-flags', help=f'vis flags (overrides the profile; release: "{VIS_FLAGS}").')
+    parser.add_argument('--qcc-flags', default=QCC_FLAGS, help='Extra qcc flags for progs.dat.')
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help='Fail on maps over a budget, e.g. pvs_surfaces_max=2000 (see bspfile.py).')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Build cache location (default: .cache).')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Build cache size limit in MB (default: %(default)s).')
+    parser.add_argument('--no-cache', action='store_true', help='Regenerate everything without the build cache.')
+    parser.add_argument('--list', action='store_true', help='Print the step graph and exit.')
+
+    args = parser.parse_args()
+
+    bsp_flags, light_flags, vis_flags = PROFILES[args.profile]
+    graph = build_graph(args.binpath, args.maps,
+                        bsp_flags if args.bsp_flags is None else args.bsp_flags,
+                        light_flags if args.light_flags is None else args.light_flags,
+                        vis_flags if args.vis_flags is None else args.vis_flags,
+                        cache_dir=None if args.no_cache else args.cache_dir,
+                        cache_size=args.cache_size * 1024 * 1024, budgets=dict(args.budget),
+                        qcc_flags=args.qcc_flags)
+
+    try:
+        graph = select(graph, args.steps or ["pack"])
+    except BuildError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.list:
+        for step in graph.values():
+            print(f"{step.name}: {' '.join(step.deps)}")
+        return
+
+    start = time.perf_counter()
+    try:
+        timings = execute(graph, args.jobs)
+    except BuildError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_report(timings, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
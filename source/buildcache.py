@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+Build Cache
+
+Content-addressed cache for generated build outputs (palette.lmp,
+colormap.lmp, pop.lmp, gfx lumps, ...).
+
+An entry's key is a hash of the tool that produced it (the tool's own
+source or binary, so editing a tool invalidates its outputs), any extra
+settings, and the bytes of every input file. A hit copies the stored
+outputs back into place and skips the tool entirely.
+
+Entries live under a local cache directory and are evicted least recently
+used first once the cache grows past its size limit.
+
+Usage:
+    buildcache.py stats
+    buildcache.py evict [--max-size MB]
+    buildcache.py clear
+"""
+
+import os
+import argparse
+import hashlib
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CACHE_DIR = os.environ.get("QUAKEKIT_CACHE_DIR", os.path.join(ROOT, ".cache"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def _hash_file_into(digest, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+def file_digest(path):
+    """
+    Hashes one file, in chunks. For a tool shared by many cache keys (like
+    a large binary), hash it once and pass the digest as an extra value
+    rather than listing it in every key's tools.
+    """
+    digest = hashlib.sha256()
+    _hash_file_into(digest, path)
+    return digest.hexdigest()
+
+class BuildCache:
+    """
+    A directory of cached build outputs.
+
+    Args:
+        directory: Where entries are stored (default: .cache in the project
+            root, or $QUAKEKIT_CACHE_DIR).
+        max_bytes: Size limit enforced by LRU eviction after each store.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.objects = os.path.join(self.directory, "objects")
+
+    def key(self, tools, inputs, extra=()):
+        """
+        Computes the cache key for one tool run.
+
+        Args:
+            tools: Paths of the scripts/binaries that make up the tool.
+            inputs: Paths of the input files, in a stable order.
+            extra: Any other strings that affect the output (flags, names).
+
+        Returns:
+            A hex digest naming the cache entry.
+        """
+        digest = hashlib.sha256()
+        for group in (tools, inputs):
+            digest.update(b"%d\0" % len(group))
+            for path in group:
+                _hash_file_into(digest, path)
+                digest.update(b"\0")
+        for value in extra:
+            digest.update(str(value).encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.objects, key[:2], key)
+
+    def get(self, key, outdir, names):
+        """
+        Restores a cached entry's files into outdir.
+
+        Returns:
+            True on a hit, False if the entry (or any of its files) is missing.
+        """
+        entry = self._entry(key)
+        if not all(os.path.isfile(os.path.join(entry, name)) for name in names):
+            return False
+
+        os.makedirs(outdir, exist_ok=True)
+        for name in names:
+            shutil.copy2(os.path.join(entry, name), os.path.join(outdir, name))
+
+        # Mark as recently used for LRU eviction
+        os.utime(entry)
+        return True
+
+    def put(self, key, outdir, names):
+        """
+        Stores files from outdir under key, then evicts old entries if the
+        cache is over its size limit.
+        """
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix=key[:8], dir=os.path.dirname(entry))
+        try:
+            for name in names:
+                shutil.copy2(os.path.join(outdir, name), os.path.join(staging, name))
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            os.replace(staging, entry)
+        except OSError:
+            # Another build stored the same entry first; theirs is just as good.
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict()
+
+    def entries(self):
+        """
+        Returns (last used time, size in bytes, path) for every entry.
+        """
+        found = []
+        if not os.path.isdir(self.objects):
+            return found
+
+        for prefix in os.scandir(self.objects):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                found.append((entry.stat().st_mtime, size, entry.path))
+        return found
+
+    def evict(self, max_bytes=None):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            The number of bytes freed.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+
+        for _, size, path in entries:
+            if total - freed <= limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            freed += size
+        return freed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def cached(cache, tools, inputs, outdir, names, produce, extra=()):
+    """
+    Runs produce() only when the outputs for these tools and inputs aren't
+    already cached, and stores what it makes.
+
+    Args:
+        cache: A BuildCache, or None to always run produce().
+        tools: Paths of the tool's scripts/binaries.
+        inputs: Paths of its input files.
+        outdir: Directory the outputs are written to.
+        names: Output file names inside outdir.
+        produce: Callable that generates the outputs; its return value is
+            passed through.
+        extra: Other strings that affect the output.
+
+    Returns:
+        (hit, value): whether the cache was used, and produce()'s result
+        (None on a hit).
+    """
+    if cache is None:
+        return False, produce()
+
+    key = cache.key(tools, inputs, extra)
+    if cache.get(key, outdir, names):
+        return True, None
+
+    value = produce()
+    cache.put(key, outdir, names)
+    return False, value
+
+def main():
+    """
+    Main function to parse command-line arguments and manage the cache.
+    """
+    parser = argparse.ArgumentParser(
+        description="Inspects and trims the QuakeKit build cache."
+    )
+    parser.add_argument('command', choices=('stats', 'evict', 'clear'))
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Cache location.')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Size limit in MB for evict (default: %(default)s).')
+
+    args = parser.parse_args()
+    cache = BuildCache(args.cache_dir, args.max_size * 1024 * 1024)
+
+    if args.command == 'stats':
+        entries = cache.entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{cache.directory}: {len(entries)} entries, {total} bytes")
+    elif args.command == 'evict':
+        print(f"Freed {cache.evict()} bytes")
+    elif args.command == 'clear':
+        cache.clear()
+        print(f"Cleared {cache.directory}")
+
+if __name__ == "__main__":
+    main()
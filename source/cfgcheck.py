@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+"""
+Config Script Analyzer
+
+Tokenizes Quake config scripts the way the engine does and checks the
+ones embedded in files.dat:
+
+- the exec graph, starting from quake.rc: 'exec' targets that don't
+  exist, and exec loops
+- keys bound more than once (the same command twice, or a later bind
+  silently replacing an earlier one), and aliases defined twice
+
+It also minifies scripts for the PAK: comments and padding are dropped
+and every command is written on its own line, with quotes only where the
+engine needs them.
+
+Commands are split as Cbuf_Execute does (at newlines, and at ';' outside
+quotes) and tokenized as COM_Parse does ('//' comments, quoted strings,
+and the single-character tokens { } ( ) ' :).
+
+Usage:
+    cfgcheck.py check [files.dat]
+    cfgcheck.py graph [files.dat]
+    cfgcheck.py minify name [files.dat]
+"""
+
+import sys
+import argparse
+import re
+
+from filesdat import FilesDat, DEFAULT_FILES_DAT
+
+ROOT_CONFIG = "quake.rc"
+
+# Written by the engine or supplied by the player, so never in files.dat
+EXTERNAL_CONFIGS = ("config.cfg", "autoexec.cfg")
+
+# Commands that read their arguments as raw text (Cmd_Args), comments and
+# spacing included; minifying keeps them exactly as written
+RAW_ARGS_COMMANDS = ("say", "say_team", "tell", "cmd")
+
+_WHITESPACE = "".join(chr(c) for c in range(33))
+_TOKEN_RE = re.compile(r"""[\x00-\x20]*(?:(//)|"([^"]*)"?|([{}()':])|([^\x00-\x20{}()':]+))""")
+_NEEDS_QUOTES_RE = re.compile(r"""[\x00-\x20{}()':;]|^$|^//""")
+
+class Command:
+    """
+    One command from a script.
+
+    Attributes:
+        tokens: The arguments, as the engine's Cmd_Argv sees them.
+        text: The raw command text.
+        line: 1-based line number in its script.
+    """
+    __slots__ = ("tokens", "text", "line")
+
+    def __init__(self, tokens, text, line):
+        self.tokens = tokens
+        self.text = text
+        self.line = line
+
+def split_commands(text):
+    """
+    Splits a script into (raw command text, line number) pairs.
+    """
+    commands = []
+    line = 1
+    for line_text in text.split("\n"):
+        if ";" not in line_text:
+            commands.append((line_text, line))
+        else:
+            start = 0
+            quoted = False
+            for i, c in enumerate(line_text):
+                if c == '"':
+                    quoted = not quoted
+                elif c == ";" and not quoted:
+                    commands.append((line_text[start:i], line))
+                    start = i + 1
+            commands.append((line_text[start:], line))
+        line += 1
+    return commands
+
+def tokenize(text):
+    """
+    Splits one command into its arguments.
+    """
+    tokens = []
+    # Every character is whitespace or starts a token, so the matches are
+    # contiguous
+    for comment, quoted, special, word in _TOKEN_RE.findall(text):
+        if comment:
+            break
+        tokens.append(quoted or special or word)
+    return tokens
+
+def parse_script(text):
+    """
+    Returns the non-empty commands of a script, in order.
+    """
+    commands = []
+    for raw, line in split_commands(text):
+        tokens = tokenize(raw)
+        if tokens:
+            commands.append(Command(tokens, raw, line))
+    return commands
+
+def quote(token):
+    return f'"{token}"' if _NEEDS_QUOTES_RE.search(token) else token
+
+def minify(text):
+    """
+    Rewrites a script with one command per line and no comments or
+    padding. The result tokenizes to exactly the same commands.
+    """
+    lines = []
+    for command in parse_script(text):
+        if command.tokens[0].lower() in RAW_ARGS_COMMANDS:
+            lines.append(command.text.lstrip(_WHITESPACE))
+        else:
+            lines.append(" ".join(quote(token) for token in command.tokens))
+    return "".join(line + "\n" for line in lines)
+
+def key_name(name):
+    # Key names are case-insensitive, except single characters, which are
+    # their own key codes
+    return name if len(name) == 1 else name.upper()
+
+class ConfigAnalyzer:
+    """
+    Checks the scripts in a FilesDat.
+
+    Attributes:
+        scripts: {name: [Command]} for every embedded script.
+        graph: {name: [exec targets]}, in order.
+        problems: (level, script, line, message) tuples, with level
+            'error' or 'warning', filled in by check().
+    """
+
+    def __init__(self, dat):
+        self.scripts = {name: parse_script(dat.read(name).decode("utf-8")) for name in dat.names()}
+        self.graph = {
+            name: [c.tokens[1] for c in commands if c.tokens[0].lower() == "exec" and len(c.tokens) > 1]
+            for name, commands in self.scripts.items()
+        }
+        self.problems = []
+
+    def _report(self, level, script, line, message):
+        self.problems.append((level, script, line, message))
+
+    def check(self):
+        """
+        Runs every check, starting from quake.rc, then from each script
+        quake.rc never reaches (those are exec'd by hand from the console).
+
+        Returns:
+            The problems list.
+        """
+        self.problems = []
+        for name, commands in self.scripts.items():
+            for command in commands:
+                if command.tokens[0].lower() == "exec" and len(command.tokens) > 1:
+                    target = command.tokens[1]
+                    if target not in self.scripts and target not in EXTERNAL_CONFIGS:
+                        self._report("error", name, command.line, f"exec of missing script '{target}'")
+
+        reached = set()
+        roots = [ROOT_CONFIG] if ROOT_CONFIG in self.scripts else []
+        for root in roots + [name for name in self.scripts if name != ROOT_CONFIG]:
+            if root not in reached:
+                self._run(root, {}, {}, [], reached)
+        return self.problems
+
+    def _run(self, name, binds, aliases, stack, reached):
+        # Follows one script in execution order, carrying the bind and
+        # alias state across exec'd scripts.
+        reached.add(name)
+        stack.append(name)
+        for command in self.scripts[name]:
+            verb = command.tokens[0].lower()
+            args = command.tokens[1:]
+
+            if verb == "exec" and args:
+                target = args[0]
+                if target in stack:
+                    self._report("error", name, command.line,
+                                 f"exec loop: {' -> '.join(stack[stack.index(target):] + [target])}")
+                elif target in self.scripts:
+                    self._run(target, binds, aliases, stack, reached)
+
+            elif verb == "unbindall":
+                binds.clear()
+
+            elif verb == "unbind" and args:
+                binds.pop(key_name(args[0]), None)
+
+            elif verb == "bind" and len(args) > 1:
+                self._redefined("bind", key_name(args[0]), " ".join(args[1:]), binds, name, command.line)
+
+            elif verb == "alias" and len(args) > 1:
+                self._redefined("alias", args[0], " ".join(args[1:]), aliases, name, command.line)
+
+        stack.pop()
+
+    def _redefined(self, kind, key, value, table, name, line):
+        previous = table.get(key)
+        if previous is not None:
+            old_value, old_name, old_line = previous
+            if old_value == value:
+                self._report("warning", name, line,
+                             f"duplicate {kind} '{key}' (same as {old_name}:{old_line})")
+            else:
+                self._report("warning", name, line,
+                             f"{kind} '{key}' replaces '{old_value}' from {old_name}:{old_line}")
+        table[key] = (value, name, line)
+
+def main():
+    """
+    Main function to parse command-line arguments and run a subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        description="Checks and minifies the Quake config scripts in files.dat."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check_cmd = commands.add_parser('check', help='Report exec, bind and alias problems.')
+    graph_cmd = commands.add_parser('graph', help='Print the exec graph.')
+    minify_cmd = commands.add_parser('minify', help='Print a minified script.')
+    minify_cmd.add_argument('name', help='The embedded script, e.g. default.cfg.')
+    for command in (check_cmd, graph_cmd, minify_cmd):
+        command.add_argument('filesdat', nargs='?', default=DEFAULT_FILES_DAT,
+                             help='Path to files.dat (default: config/files.dat).')
+
+    args = parser.parse_args()
+
+    try:
+        dat = FilesDat(args.filesdat)
+        if args.command == 'minify':
+            sys.stdout.write(minify(dat.read(args.name).decode("utf-8")))
+            return
+
+        analyzer = ConfigAnalyzer(dat)
+        if args.command == 'graph':
+            for name, targets in analyzer.graph.items():
+                print(f"{name} -> {', '.join(targets) if targets else '(none)'}")
+
+        elif args.command == 'check':
+            problems = analyzer.check()
+            for level, script, line, message in problems:
+                print(f"{script}:{line}: {level}: {message}")
+            errors = sum(1 for level, _, _, _ in problems if level == "error")
+            print(f"{len(analyzer.scripts)} scripts, {errors} errors, {len(problems) - errors} warnings")
+            if errors:
+                sys.exit(1)
+
+    except KeyError as e:
+        print(f"Error: {args.filesdat} has no file {e}", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, UnicodeDecodeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
 import sys
 import os
 
+from palindex import PaletteIndex
+from palette import read_palette
+
+# The last 32 palette entries are fullbright: lighting never dims them.
+NUM_FULLBRIGHTS = 32
+
+# NumPy is optional; without it the colormap falls back to the pure-Python path.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def convert_24_to_8(palette, rgb):
     """
     Samples a 24-bit RGB value to the closest color on the provided
@@ -32,11 +44,26 @@ def generate_colormap(palette):
     The final 32 colors are treated as "fullbright" and are not affected
     by lighting.
 
+    Uses the NumPy batch engine when NumPy is installed, and the
+    pure-Python loop otherwise. Both produce identical output.
+
+    :param palette: The input 256-color palette (a list of 768 bytes).
+    :return: The generated colormap (a list of 16384 bytes).
+    """
+    if np is not None:
+        return generate_colormap_numpy(palette)
+    return generate_colormap_python(palette)
+
+def generate_colormap_python(palette):
+    """
+    Pure-Python colormap generator, one palette index lookup per cell.
+
     :param palette: The input 256-color palette (a list of 768 bytes).
     :return: The generated colormap (a list of 16384 bytes).
     """
     colormap = [0] * (64 * 256)
-    num_fullbrights = 32
+    num_fullbrights = NUM_FULLBRIGHTS
+    index = PaletteIndex(palette)
 
     # A 256x64 grid: 256 palette entries, 64 light levels
     for y in range(64):       # Light level
@@ -56,36 +83,66 @@ def generate_colormap(palette):
                     rgb[i] = 255
 
             # Find the closest color in the original palette for the new dimmed color
-            colormap[y * 256 + x] = convert_24_to_8(palette, rgb)
+            colormap[y * 256 + x] = index.lookup(rgb)
 
     return colormap
 
+def generate_colormap_numpy(palette):
+    """
+    NumPy colormap generator. Dims every non-fullbright palette entry for
+    all 64 light levels at once and resolves them against the palette with
+    a single distance matrix.
+
+    np.argmin returns the first minimum, which matches the strict '<'
+    comparison in `convert_24_to_8`, so ties resolve to the lowest index.
+
+    :param palette: The input 256-color palette (a list of 768 bytes).
+    :return: The generated colormap (a list of 16384 bytes).
+    """
+    num_fullbrights = NUM_FULLBRIGHTS
+    num_lit = 256 - num_fullbrights
+
+    pal = np.asarray(palette, dtype=np.int32).reshape(256, 3)
+
+    # (64, 1, 1) light scale against (1, num_lit, 3) colors -> (64, num_lit, 3)
+    scale = (63 - np.arange(64, dtype=np.int32)).reshape(64, 1, 1)
+    dimmed = np.minimum((pal[:num_lit][np.newaxis] * scale + 16) >> 5, 255)
+
+    # Squared distances of every dimmed color to every palette entry:
+    # (64 * num_lit, 1, 3) - (1, 256, 3) -> (64 * num_lit, 256)
+    diff = dimmed.reshape(-1, 1, 3) - pal[np.newaxis]
+    dist = np.einsum('ijk,ijk->ij', diff, diff)
+
+    colormap = np.empty((64, 256), dtype=np.uint8)
+    colormap[:, :num_lit] = dist.argmin(axis=1).reshape(64, num_lit)
+    colormap[:, num_lit:] = np.arange(num_lit, 256, dtype=np.uint8)
+
+    return colormap.ravel().tolist()
+
 def main():
     """
     Main function to handle file I/O and colormap generation.
     """
     # --- Argument check ---
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input_palette.lmp>", file=sys.stderr)
+        print(f"Usage: {sys.argv[0]} <input_palette.lmp|.pal|.act|.gpl|.tga|.png>", file=sys.stderr)
         print("       Generates 'colormap.lmp' in the current directory.", file=sys.stderr)
         sys.exit(1)
 
     palette_filename = sys.argv[1]
     colormap_filename = "colormap.lmp"
 
-    # --- Read input palette file ---
+    # --- Read input palette file (any format palette.py knows) ---
     try:
-        with open(palette_filename, 'rb') as f_in:
-            palette = list(f_in.read())
+        palette = list(read_palette(palette_filename))
     except FileNotFoundError:
         print(f"Error: The file '{palette_filename}' was not found.", file=sys.stderr)
         sys.exit(1)
     except IOError as e:
         print(f"Error opening input palette file: {e}", file=sys.stderr)
         sys.exit(1)
-
-    if len(palette) != 768:
-        print(f"Error: Input palette file is not 768 bytes long. Read {len(palette)} bytes.", file=sys.stderr)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
     print(f"✅ Successfully read {palette_filename} ({len(palette)} bytes).")
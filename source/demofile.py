@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+
+"""
+Demo File Reader
+
+Streaming parser and indexer for NetQuake .dem demos.
+
+A demo is a text line holding the CD track, then a run of message
+blocks: a 32-bit length, the three view angles as floats, and that many
+bytes of server messages. DemoFile memory-maps the demo, walks the block
+headers once, and keeps an index of frame offsets and timestamps, so any
+frame can be read without decoding the ones before it. The map name and
+protocol version come from the svc_serverinfo message in the signon
+blocks.
+
+parse_messages() splits a block into individual server messages
+(protocol 15, the original NetQuake protocol). It is the basis for
+checking demos and for compact_frames(), which re-encodes a demo smaller
+without changing how it plays back.
+
+Usage:
+    demofile.py info demo1.dem ...
+    demofile.py check [--maps maps/] [-j N] demo1.dem ...
+    demofile.py compact demo1.dem out.dem
+"""
+
+import sys
+import os
+import argparse
+import math
+import mmap
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK_HEADER = struct.Struct("<l3f")
+MAX_BLOCK_SIZE = 65536
+PROTOCOL_NETQUAKE = 15
+
+# The engine's net_message buffer; merged blocks must still fit in it
+MAX_MSGLEN = 8000
+SIGNONS = 4
+
+# Server message types (protocol.h)
+svc_bad = 0
+svc_nop = 1
+svc_disconnect = 2
+svc_updatestat = 3
+svc_version = 4
+svc_setview = 5
+svc_sound = 6
+svc_time = 7
+svc_print = 8
+svc_stufftext = 9
+svc_setangle = 10
+svc_serverinfo = 11
+svc_lightstyle = 12
+svc_updatename = 13
+svc_updatefrags = 14
+svc_clientdata = 15
+svc_stopsound = 16
+svc_updatecolors = 17
+svc_particle = 18
+svc_damage = 19
+svc_spawnstatic = 20
+svc_spawnbinary = 21
+svc_spawnbaseline = 22
+svc_temp_entity = 23
+svc_setpause = 24
+svc_signonnum = 25
+svc_centerprint = 26
+svc_killedmonster = 27
+svc_foundsecret = 28
+svc_spawnstaticsound = 29
+svc_intermission = 30
+svc_finale = 31
+svc_cdtrack = 32
+svc_sellscreen = 33
+svc_cutscene = 34
+
+# Fast entity updates have the high bit set instead of a message type
+svc_fastupdate = 0x80
+
+# Messages with a fixed payload size (in bytes, after the type byte)
+_FIXED_SIZES = {
+    svc_nop: 0, svc_disconnect: 0, svc_updatestat: 5, svc_version: 4,
+    svc_setview: 2, svc_time: 4, svc_setangle: 3, svc_updatefrags: 3,
+    svc_stopsound: 2, svc_updatecolors: 2, svc_particle: 11, svc_damage: 8,
+    svc_spawnstatic: 13, svc_spawnbaseline: 15, svc_setpause: 1,
+    svc_signonnum: 1, svc_killedmonster: 0, svc_foundsecret: 0,
+    svc_spawnstaticsound: 9, svc_intermission: 0, svc_cdtrack: 2,
+    svc_sellscreen: 0,
+}
+
+# Messages that are a single string
+_STRING_MESSAGES = {svc_print, svc_stufftext, svc_centerprint, svc_finale, svc_cutscene}
+
+# svc_temp_entity payload sizes by type: positions are 3 coords (6 bytes),
+# beams are an entity number and two positions.
+_TEMP_ENTITY_SIZES = {
+    0: 6, 1: 6, 2: 6, 3: 6, 4: 6, 5: 14, 6: 14, 7: 6,
+    8: 6, 9: 14, 10: 6, 11: 6, 12: 8, 13: 14,
+}
+
+# svc_clientdata bits with a one-byte field, in any order (only the count matters)
+_CLIENTDATA_BYTE_BITS = (1 << 0, 1 << 1, 1 << 2, 1 << 3, 1 << 4, 1 << 5, 1 << 6, 1 << 7,
+                         1 << 12, 1 << 13, 1 << 14)
+SU_ITEMS = 1 << 9
+
+# Fast update bits and the size of the field each one adds
+U_MOREBITS = 1 << 0
+U_LONGENTITY = 1 << 14
+_UPDATE_FIELDS = (
+    (1 << 10, 1),   # U_MODEL
+    (1 << 6, 1),    # U_FRAME
+    (1 << 11, 1),   # U_COLORMAP
+    (1 << 12, 1),   # U_SKIN
+    (1 << 13, 1),   # U_EFFECTS
+    (1 << 1, 2),    # U_ORIGIN1
+    (1 << 8, 1),    # U_ANGLE1
+    (1 << 2, 2),    # U_ORIGIN2
+    (1 << 4, 1),    # U_ANGLE2
+    (1 << 3, 2),    # U_ORIGIN3
+    (1 << 9, 1),    # U_ANGLE3
+)
+
+# Messages that set a piece of client state, so resending the current
+# value changes nothing. The indexed ones are keyed by type and their first
+# payload byte (the stat, style or player slot); the rest hold one value.
+_INDEXED_STATE_MESSAGES = {svc_updatestat, svc_lightstyle, svc_updatename, svc_updatefrags,
+                           svc_updatecolors}
+_STATE_MESSAGES = _INDEXED_STATE_MESSAGES | {svc_setview, svc_cdtrack}
+
+# Stats (quakedef.h) that other messages change behind svc_updatestat's back
+STAT_SECRETS = 13
+STAT_MONSTERS = 14
+# svc_clientdata rewrites health, weapon, ammo, armor, weaponframe, the four
+# ammo counts and the active weapon every time (CL_ParseClientdata)
+_CLIENTDATA_STATS = (0, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+_STAT_CHANGES = {
+    svc_killedmonster: (STAT_MONSTERS,),
+    svc_foundsecret: (STAT_SECRETS,),
+    svc_clientdata: _CLIENTDATA_STATS,
+}
+
+class DemoError(ValueError):
+    pass
+
+def _string_end(data, pos):
+    end = data.find(b"\x00", pos)
+    if end < 0:
+        raise DemoError("unterminated string in message")
+    return end + 1
+
+def _message_end(data, pos):
+    """
+    Returns the offset just past the message starting at data[pos].
+    """
+    cmd = data[pos]
+    pos += 1
+
+    if cmd & svc_fastupdate:
+        bits = cmd & 0x7F
+        if bits & U_MOREBITS:
+            bits |= data[pos] << 8
+            pos += 1
+        pos += 2 if bits & U_LONGENTITY else 1
+        for bit, size in _UPDATE_FIELDS:
+            if bits & bit:
+                pos += size
+        return pos
+
+    size = _FIXED_SIZES.get(cmd)
+    if size is not None:
+        return pos + size
+
+    if cmd in _STRING_MESSAGES:
+        return _string_end(data, pos)
+
+    if cmd in (svc_lightstyle, svc_updatename):
+        return _string_end(data, pos + 1)
+
+    if cmd == svc_sound:
+        field_mask = data[pos]
+        pos += 1 + bool(field_mask & 1) + bool(field_mask & 2)
+        return pos + 2 + 1 + 6
+
+    if cmd == svc_clientdata:
+        bits = data[pos] | (data[pos + 1] << 8)
+        pos += 2
+        pos += sum(1 for bit in _CLIENTDATA_BYTE_BITS if bits & bit)
+        if bits & SU_ITEMS:
+            pos += 4
+        # health (short), then ammo, shells, nails, rockets, cells, active weapon
+        return pos + 2 + 6
+
+    if cmd == svc_temp_entity:
+        size = _TEMP_ENTITY_SIZES.get(data[pos])
+        if size is None:
+            raise DemoError(f"unknown temp entity type {data[pos]}")
+        return pos + 1 + size
+
+    if cmd == svc_serverinfo:
+        pos += 4 + 1 + 1
+        pos = _string_end(data, pos)
+        for _ in range(2):  # model list, then sound list, each ending in ""
+            while data[pos] != 0:
+                pos = _string_end(data, pos)
+            pos += 1
+        return pos
+
+    raise DemoError(f"unknown server message {cmd}")
+
+def parse_messages(data):
+    """
+    Splits one block of protocol 15 server messages.
+
+    Args:
+        data: The message bytes of a block (bytes or memoryview).
+
+    Returns:
+        A list of (message type, start, end) spans. Fast entity updates are
+        reported as svc_fastupdate.
+
+    Raises:
+        DemoError: If the block can't be parsed.
+    """
+    data = bytes(data)
+    spans = []
+    pos = 0
+    try:
+        while pos < len(data):
+            end = _message_end(data, pos)
+            if end > len(data):
+                raise DemoError("message runs past the end of its block")
+            cmd = data[pos]
+            spans.append((svc_fastupdate if cmd & svc_fastupdate else cmd, pos, end))
+            pos = end
+    except IndexError:
+        raise DemoError("message runs past the end of its block")
+    return spans
+
+def parse_serverinfo(data, pos):
+    """
+    Reads an svc_serverinfo message body (after the type byte) from bytes.
+
+    Returns:
+        (protocol, maxclients, gametype, level name, model list, sound list)
+    """
+    protocol, maxclients, gametype = struct.unpack_from("<l2B", data, pos)
+    pos += 6
+
+    def read_string():
+        nonlocal pos
+        end = _string_end(data, pos)
+        value = bytes(data[pos:end - 1]).decode("latin-1")
+        pos = end
+        return value
+
+    levelname = read_string()
+    lists = []
+    for _ in range(2):
+        items = []
+        while data[pos] != 0:
+            items.append(read_string())
+        pos += 1
+        lists.append(items)
+
+    return protocol, maxclients, gametype, levelname, lists[0], lists[1]
+
+class DemoFile:
+    """
+    A memory-mapped, indexed demo.
+
+    Attributes:
+        cdtrack: The CD track text from the first line.
+        offsets: Byte offset of every frame's block header.
+        times: Server time of every frame, from its leading svc_time
+            (frames without one repeat the previous time).
+        protocol, map, levelname: From svc_serverinfo (None if absent).
+
+    Raises:
+        DemoError: If the file is not a well-formed demo.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size == 0:
+                raise DemoError(f"{filename} is empty")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+            self._index(size)
+        except Exception:
+            self.close()
+            raise
+
+    def _index(self, size):
+        line_end = self._map.find(b"\n", 0, 16)
+        if line_end < 0:
+            raise DemoError(f"{self.filename} has no CD track line")
+        self.cdtrack = bytes(self._map[:line_end]).decode("latin-1").strip()
+        self.data_offset = line_end + 1
+
+        self.offsets = array("l")
+        self.times = array("d")
+        self.protocol = None
+        self.map = None
+        self.levelname = None
+
+        pos = self.data_offset
+        time = 0.0
+        while pos < size:
+            if pos + BLOCK_HEADER.size > size:
+                raise DemoError(f"{self.filename}: truncated block header at offset {pos}")
+            length = BLOCK_HEADER.unpack_from(self._map, pos)[0]
+            if length < 0 or length > MAX_BLOCK_SIZE or pos + BLOCK_HEADER.size + length > size:
+                raise DemoError(f"{self.filename}: bad block length {length} at offset {pos}")
+
+            start = pos + BLOCK_HEADER.size
+            # The server starts every datagram with svc_time
+            if length >= 5 and self._map[start] == svc_time:
+                time = struct.unpack_from("<f", self._map, start + 1)[0]
+
+            if self.protocol is None:
+                self._find_serverinfo(start, length)
+
+            self.offsets.append(pos)
+            self.times.append(time)
+            pos = start + length
+
+    def _find_serverinfo(self, start, length):
+        # Only signon blocks are searched, and they come first; parsing
+        # stops at the first block that has a serverinfo message.
+        data = bytes(self._map[start:start + length])
+        for cmd, begin, end in parse_messages(data):
+            if cmd == svc_serverinfo:
+                protocol, _, _, levelname, models, _ = parse_serverinfo(data, begin + 1)
+                self.protocol = protocol
+                self.levelname = levelname
+                if models and models[0].startswith("maps/") and models[0].endswith(".bsp"):
+                    self.map = models[0][len("maps/"):-len(".bsp")]
+                return
+
+    def close(self):
+        """
+        Releases the mapping. Views handed out by frame() must be released first.
+        """
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self):
+        return self.times[-1] - self.times[0] if self.times else 0.0
+
+    def frame(self, i):
+        """
+        Returns frame i as (view angles, message data), with the data as a
+        zero-copy view of the mapping.
+        """
+        pos = self.offsets[i]
+        length, pitch, yaw, roll = BLOCK_HEADER.unpack_from(self._map, pos)
+        start = pos + BLOCK_HEADER.size
+        return (pitch, yaw, roll), self._view[start:start + length]
+
+    def seek(self, time):
+        """
+        Returns the index of the first frame at or after a server time.
+        """
+        lo, hi = 0, len(self.times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[mid] < time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+def normalize_angle(angle):
+    """
+    Wraps an angle into [-180, 180). The result is exact in float32, and
+    the engine interpolates demo angles modulo 360, so playback is unchanged.
+    """
+    if -180.0 <= angle < 180.0:
+        return angle + 0.0  # also turns -0.0 into 0.0
+    return angle - 360.0 * math.floor((angle + 180.0) / 360.0)
+
+def _cleared_state():
+    # What CL_ClearState leaves behind: empty light styles and player names
+    state = {}
+    for i in range(256):
+        state[(svc_lightstyle, i)] = bytes((svc_lightstyle, i, 0))
+        state[(svc_updatename, i)] = bytes((svc_updatename, i, 0))
+    return state
+
+def compact_frames(demo):
+    """
+    Re-encodes a demo's frames without changing what the client does.
+
+    - svc_nop messages are dropped, as is any state message (light style,
+      name, frags, colors, stat, view entity, CD track) that resends the
+      value the client already has.
+    - View angles are wrapped into [-180, 180).
+    - A frame without svc_time is folded into the next one when its angles
+      match the frame before it. The client reads such frames back to back
+      in one go, so the only thing merging could change is the angle it
+      interpolates from, and that is the same here. Frames that finish the
+      signon are kept separate, since the client starts pacing reads by
+      server time after them.
+
+    Args:
+        demo: A DemoFile using protocol 15.
+
+    Yields:
+        (view angles, message data) for each output frame.
+    """
+    if demo.protocol != PROTOCOL_NETQUAKE:
+        raise DemoError(f"can't compact protocol {demo.protocol} demos")
+
+    state = _cleared_state()
+    last_angles = (0.0, 0.0, 0.0)
+    pending = b""
+
+    for i in range(len(demo)):
+        angles, view = demo.frame(i)
+        with view:
+            data = bytes(view)
+        angles = tuple(normalize_angle(a) for a in angles)
+
+        kept = []
+        separate = False
+        for cmd, start, end in parse_messages(data):
+            message = data[start:end]
+            if cmd == svc_serverinfo:
+                state = _cleared_state()
+            elif cmd == svc_nop:
+                continue
+            elif cmd in _STATE_MESSAGES:
+                key = (cmd, message[1]) if cmd in _INDEXED_STATE_MESSAGES else (cmd,)
+                if state.get(key) == message:
+                    continue
+                state[key] = message
+            elif cmd in _STAT_CHANGES:
+                # The client's value has moved on, so the next update must go through
+                for stat in _STAT_CHANGES[cmd]:
+                    state.pop((svc_updatestat, stat), None)
+            elif cmd == svc_time or (cmd == svc_signonnum and message[1] >= SIGNONS):
+                separate = True
+            kept.append(message)
+        data = b"".join(kept)
+
+        if pending and len(pending) + len(data) > MAX_MSGLEN:
+            yield last_angles, pending
+            pending = b""
+        data = pending + data
+        pending = b""
+
+        if not separate and angles == last_angles and i + 1 < len(demo):
+            pending = data
+            continue
+
+        yield angles, data
+        last_angles = angles
+
+    if pending:
+        yield last_angles, pending
+
+def compact_demo(src, dst):
+    """
+    Writes a compacted copy of a demo (see compact_frames).
+
+    Returns:
+        (original size, compacted size) in bytes.
+    """
+    with DemoFile(src) as demo:
+        chunks = [demo.cdtrack.encode("latin-1") + b"\n"]
+        for angles, data in compact_frames(demo):
+            chunks.append(BLOCK_HEADER.pack(len(data), *angles))
+            chunks.append(data)
+        size = os.path.getsize(src)
+
+    # Written through a temporary so src and dst can be the same file
+    tmpname = dst + ".tmp"
+    with open(tmpname, "wb") as f:
+        f.writelines(chunks)
+    os.replace(tmpname, dst)
+    return size, sum(len(chunk) for chunk in chunks)
+
+def check_demo(filename, mapdir=None):
+    """
+    Indexes a demo and fully parses its messages.
+
+    Args:
+        filename: The demo to check.
+        mapdir: If given, the demo's map must have a .map source here.
+
+    Returns:
+        A list of problems (empty if the demo is fine).
+    """
+    try:
+        with DemoFile(filename) as demo:
+            problems = []
+            if demo.protocol is None:
+                problems.append("no svc_serverinfo found")
+            elif demo.protocol != PROTOCOL_NETQUAKE:
+                problems.append(f"protocol {demo.protocol} is not supported (expected {PROTOCOL_NETQUAKE})")
+            else:
+                for i in range(len(demo)):
+                    angles, data = demo.frame(i)
+                    with data:
+                        parse_messages(data)
+
+            if mapdir is not None and demo.map is not None and \
+                    not os.path.isfile(os.path.join(mapdir, demo.map + ".map")):
+                problems.append(f"map '{demo.map}' is not in {mapdir}")
+            return problems
+    except (IOError, DemoError) as e:
+        return [str(e)]
+
+def main():
+    """
+    Main function to parse command-line arguments and run a subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        description="Inspects and validates Quake .dem demo files."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info_cmd = commands.add_parser('info', help='Print what a demo contains.')
+    info_cmd.add_argument('demos', nargs='+', help='Demo files.')
+
+    check_cmd = commands.add_parser('check', help='Validate demos; exits non-zero on any problem.')
+    check_cmd.add_argument('demos', nargs='+', help='Demo files.')
+    check_cmd.add_argument('--maps', help='Map source directory the demo maps must be in (e.g. maps/).')
+    check_cmd.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: all cores).')
+
+    compact_cmd = commands.add_parser('compact', help='Write a smaller demo that plays back the same.')
+    compact_cmd.add_argument('demo', help='Demo to read.')
+    compact_cmd.add_argument('output', help='Demo to write (may be the same file).')
+
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        try:
+            before, after = compact_demo(args.demo, args.output)
+        except (IOError, DemoError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{args.demo}: {before} -> {after} bytes")
+
+    elif args.command == 'info':
+        for filename in args.demos:
+            try:
+                with DemoFile(filename) as demo:
+                    print(f"{filename}: map {demo.map}, protocol {demo.protocol}, "
+                          f"cd track {demo.cdtrack}, {len(demo)} frames, {demo.duration:.1f}s")
+            except (IOError, DemoError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+
+    elif args.command == 'check':
+        if args.jobs == 1 or len(args.demos) < 2:
+            results = [check_demo(filename, args.maps) for filename in args.demos]
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                results = list(pool.map(check_demo, args.demos, [args.maps] * len(args.demos)))
+
+        failed = 0
+        for filename, problems in zip(args.demos, results):
+            for problem in problems:
+                print(f"{filename}: {problem}", file=sys.stderr)
+            failed += bool(problems)
+
+        print(f"{len(args.demos) - failed} of {len(args.demos)} demos OK")
+        if failed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
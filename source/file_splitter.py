@@ -1,45 +1,68 @@
 import os
 import sys
 
-def split_ascii_file(input_filepath):
-    output_filename = None
-    output_file_handle = None
-    
+from filesdat import FilesDat
+from cfgcheck import minify
+
+def write_if_changed(filename, data):
+    """
+    Writes data to filename through a temporary file and an atomic rename,
+    unless the file already holds exactly those bytes, so unchanged outputs
+    keep their mtime.
+
+    Returns:
+        True if the file was written.
+    """
     try:
-        with open(input_filepath, 'r') as infile:
-            for line in infile:
-                if line.startswith('/*') and not line.startswith('*/'):
-                    # [cite_start]Found an opening comment marker, extract filename [cite: 4]
-                    if output_file_handle:
-                        # Close the previous file if it was open
-                        output_file_handle.close()
-                    output_filename = line[2:].strip() # Remove '/*' and strip whitespace
-                    output_file_handle = open(output_filename, 'w')
-                elif line.startswith('*/'):
-                    # Found a closing comment marker
-                    if output_file_handle:
-                        output_file_handle.close()
-                        output_file_handle = None
-                        output_filename = None
-                else:
-                    # [cite_start]Write lines to the current output file if one is open [cite: 5, 6]
-                    if output_file_handle:
-                        output_file_handle.write(line)
+        if os.path.getsize(filename) == len(data):
+            with open(filename, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
 
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_filepath}' not found.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        # Ensure the last file is closed if the program exits
-        if output_file_handle:
-            output_file_handle.close()
+    tmpname = filename + ".tmp"
+    with open(tmpname, "wb") as f:
+        f.write(data)
+    os.replace(tmpname, filename)
+    return True
+
+def split_ascii_file(input_filepath, minified=False):
+    """
+    Extracts every embedded file in files.dat into the current directory.
+    With minified=True, scripts are written without comments or padding.
+
+    Returns:
+        A list of (filename, written) pairs, where written is False for
+        files that were already up to date.
+    """
+    dat = FilesDat(input_filepath)
+    results = []
+    for name in dat.names():
+        data = dat.read(name)
+        if minified:
+            data = minify(data.decode("utf-8")).encode("utf-8")
+        results.append((name, write_if_changed(name, data)))
+    return results
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: filesplitter <path_to_ascii_file>")
+    args = [arg for arg in sys.argv[1:] if arg != "--minify"]
+    if len(args) != 1:
+        print("Usage: filesplitter [--minify] <path_to_ascii_file>")
         sys.exit(1)
-    
-    input_file_path = sys.argv[1]
-    split_ascii_file(input_file_path)
-    print(f"Processing complete. Files extracted from '{input_file_path}'.")
\ No newline at end of file
+
+    input_file_path = args[0]
+    try:
+        results = split_ascii_file(input_file_path, minified="--minify" in sys.argv[1:])
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file_path}' not found.")
+        sys.exit(1)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
+
+    written = [name for name, changed in results if changed]
+    for name in written:
+        print(f"Wrote {name}")
+    print(f"Processing complete. Files extracted from '{input_file_path}' "
+          f"({len(written)} written, {len(results) - len(written)} unchanged).")
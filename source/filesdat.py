@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+files.dat Library
+
+config/files.dat embeds the game's config files (quake.rc, default.cfg,
+...) as comment-delimited sections:
+
+    /*quake.rc
+    exec default.cfg
+    ...
+    */
+
+FilesDat indexes the byte range of every section in one pass and reads
+a section from disk only when asked for it. Replacing a section patches
+the file in place (the section and whatever follows it) and shifts the
+offsets of later sections instead of re-indexing the whole file.
+
+The splitter (file_splitter.py), the editor (config/datedit.py) and the
+build driver all use this module.
+
+Usage:
+    filesdat.py list [files.dat]
+    filesdat.py cat name [files.dat]
+    filesdat.py startdemos [files.dat]
+"""
+
+import sys
+import os
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FILES_DAT = os.path.join(ROOT, "config", "files.dat")
+
+def normalize_newlines(data):
+    """
+    Converts '\\r\\n' and '\\r' line endings to '\\n', as text-mode reads do.
+    """
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+class Section:
+    """
+    One embedded file: its name and where it sits in files.dat.
+
+    Attributes:
+        header: Offset of the '/*name' line.
+        start, end: Byte range of the contents.
+        closed: Whether a '*/' line ends it (it runs to the end of the file
+            if not).
+    """
+    __slots__ = ("name", "header", "start", "end", "closed")
+
+    def __init__(self, name, header, start, end, closed):
+        self.name = name
+        self.header = header
+        self.start = start
+        self.end = end
+        self.closed = closed
+
+def index_sections(data):
+    """
+    Finds the embedded files in the contents of files.dat.
+
+    A line starting with '/*' opens a file named by the rest of the line,
+    and a line starting with '*/' closes it. Opening a new file also closes
+    the previous one, and a name that appears twice keeps its last contents.
+
+    Returns:
+        {name: Section}, in file order.
+    """
+    sections = {}
+    current = None
+    pos = 0
+
+    while pos < len(data):
+        end = data.find(b"\n", pos)
+        end = len(data) if end < 0 else end + 1
+
+        if data.startswith(b"/*", pos):
+            if current:
+                current.end = pos
+            name = data[pos + 2:end].strip().decode("utf-8")
+            current = Section(name, pos, end, end, False) if name else None
+            if current:
+                sections.pop(name, None)
+                sections[name] = current
+        elif data.startswith(b"*/", pos):
+            if current:
+                current.end = pos
+                current.closed = True
+            current = None
+
+        pos = end
+
+    if current:
+        current.end = len(data)
+    return sections
+
+class FilesDat:
+    """
+    An indexed files.dat.
+
+    The index is rebuilt automatically if the file changes on disk behind
+    this object's back.
+
+    Args:
+        filename: Path to files.dat (default: config/files.dat).
+    """
+
+    def __init__(self, filename=DEFAULT_FILES_DAT):
+        self.filename = filename
+        self.reindex()
+
+    def _stamp(self):
+        st = os.stat(self.filename)
+        return st.st_size, st.st_mtime_ns
+
+    def reindex(self):
+        """
+        Rebuilds the section index from the file.
+        """
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        self.sections = index_sections(data)
+        self._size = len(data)
+        self._stamp_seen = self._stamp()
+
+    def _check(self):
+        if self._stamp() != self._stamp_seen:
+            self.reindex()
+
+    def names(self):
+        self._check()
+        return list(self.sections)
+
+    def __contains__(self, name):
+        self._check()
+        return name in self.sections
+
+    def read(self, name):
+        """
+        Returns one section's contents, with '\\n' line endings.
+
+        Raises:
+            KeyError: If there is no such section.
+        """
+        self._check()
+        section = self.sections[name]
+        with open(self.filename, "rb") as f:
+            f.seek(section.start)
+            return normalize_newlines(f.read(section.end - section.start))
+
+    def write(self, name, data):
+        """
+        Replaces one section's contents (or appends a new section), touching
+        only the bytes from that section onwards.
+
+        Args:
+            name: The section name.
+            data: New contents as bytes; a final newline is added if missing.
+        """
+        self._check()
+        if data and not data.endswith(b"\n"):
+            data += b"\n"
+
+        section = self.sections.get(name)
+        with open(self.filename, "r+b") as f:
+            if section is None:
+                prefix = b"" if self._size == 0 else b"\n"
+                f.seek(self._size)
+                f.write(prefix + f"/*{name}\n".encode("utf-8") + data + b"*/\n")
+                header = self._size + len(prefix)
+                start = header + len(name.encode("utf-8")) + 3
+                self.sections[name] = Section(name, header, start, start + len(data), True)
+                self._size = f.tell()
+            else:
+                tail_start = section.end
+                f.seek(tail_start)
+                tail = f.read()
+                if not section.closed:
+                    tail = b"*/\n" + tail
+                f.seek(section.start)
+                f.write(data + tail)
+                f.truncate()
+
+                # Shift everything after the edited section
+                delta = section.start + len(data) - tail_start
+                section.end = section.start + len(data)
+                if not section.closed:
+                    section.closed = True
+                    delta += 3
+                for other in self.sections.values():
+                    if other.header > section.header:
+                        other.header += delta
+                        other.start += delta
+                        other.end += delta
+                self._size = f.tell()
+
+        self._stamp_seen = self._stamp()
+
+    def lines(self):
+        """
+        Yields every line of every section, without comments or the newline.
+        """
+        for name in self.names():
+            for line in self.read(name).decode("utf-8").splitlines():
+                line = line.split("//", 1)[0].strip()
+                if line:
+                    yield line
+
+    def startdemos(self):
+        """
+        Returns the demo names listed by 'startdemos' commands, in order.
+        """
+        demos = []
+        for line in self.lines():
+            words = line.split()
+            if words[0] == "startdemos":
+                demos.extend(words[1:])
+        return demos
+
+def main():
+    """
+    Main function to parse command-line arguments and run a query.
+    """
+    parser = argparse.ArgumentParser(
+        description="Queries the config files embedded in files.dat."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_cmd = commands.add_parser('list', help='List the embedded files.')
+    cat_cmd = commands.add_parser('cat', help='Print one embedded file.')
+    cat_cmd.add_argument('name', help='The embedded file to print.')
+    demos_cmd = commands.add_parser('startdemos', help="Print the 'startdemos' demo names, one per line.")
+    for command in (list_cmd, cat_cmd, demos_cmd):
+        command.add_argument('filesdat', nargs='?', default=DEFAULT_FILES_DAT,
+                             help='Path to files.dat (default: config/files.dat).')
+
+    args = parser.parse_args()
+
+    try:
+        dat = FilesDat(args.filesdat)
+        if args.command == 'list':
+            for name in dat.names():
+                section = dat.sections[name]
+                print(f"{section.start:8d} {section.end - section.start:8d}  {name}")
+        elif args.command == 'cat':
+            sys.stdout.buffer.write(dat.read(args.name))
+        elif args.command == 'startdemos':
+            for demo in dat.startdemos():
+                print(demo)
+    except KeyError as e:
+        print(f"Error: {args.filesdat} has no file {e}", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, UnicodeDecodeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+Batch Image Conversion
+
+Shared front end for the one-file-at-a-time image converters (tga2pal,
+png2pal, png2ppm): runs a converter over many files on a process pool
+and collects a result per file instead of printing as it goes.
+
+A converter is a module-level function taking a source path and
+returning the path it wrote. It signals a bad input by raising
+ValueError (or IOError), which becomes that file's error; the rest of
+the batch carries on.
+"""
+
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+class ConvertResult:
+    """
+    The outcome of converting one file: output is the written path, or
+    None with error set to the reason it failed.
+    """
+    __slots__ = ("source", "output", "error")
+
+    def __init__(self, source, output=None, error=None):
+        self.source = source
+        self.output = output
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {"source": self.source, "output": self.output, "error": self.error}
+
+def _convert_one(convert, filename):
+    try:
+        return ConvertResult(filename, output=convert(filename))
+    except FileNotFoundError:
+        return ConvertResult(filename, error=f"couldn't find {filename}")
+    except (IOError, ValueError) as e:
+        return ConvertResult(filename, error=str(e))
+
+def convert_files(convert, files, jobs=None):
+    """
+    Runs a converter over a list of files.
+
+    Args:
+        convert: Picklable function, source path -> written path.
+        files: The source paths.
+        jobs: Worker processes (default: all cores; 1 runs in-process).
+
+    Returns:
+        A ConvertResult per file, in the order given.
+    """
+    files = list(files)
+    if jobs == 1 or len(files) < 2:
+        return [_convert_one(convert, filename) for filename in files]
+
+    workers = jobs or os.cpu_count() or 1
+    # Big chunks keep the per-task overhead down on thousands of small files
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_convert_one, [convert] * len(files), files, chunksize=chunksize))
+
+def add_jobs_argument(parser):
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes (default: all cores).')
+
+def report(results):
+    """
+    Prints the results the way the converters always have, errors to stderr.
+
+    Returns:
+        The number of files that failed.
+    """
+    failed = 0
+    for result in results:
+        if result.ok:
+            print(f"writing {result.output}")
+        else:
+            print(f"Error: {result.error}", file=sys.stderr)
+            failed += 1
+    return failed
@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
-import struct
+
+from wad2 import WAD2File, WAD2Writer
+
+# Lump type given to .lmp files added through the editor
+NEW_LUMP_TYPE = 0x45
 
 class WAD2Editor(tk.Tk):
     def __init__(self):
@@ -83,28 +87,17 @@ class WAD2Editor(tk.Tk):
         self.listbox.delete(0, tk.END)
 
         try:
-            with open(file_path, 'rb') as f:
-                # Read WAD header
-                magic = f.read(4)
-                if magic != b'WAD2':
-                    raise ValueError("Not a valid WAD2 file.")
-
-                num_entries, = struct.unpack('<I', f.read(4))
-                dir_offset, = struct.unpack('<I', f.read(4))
-
-                # Read WAD directory
-                f.seek(dir_offset)
-                for _ in range(num_entries):
-                    entry_data = f.read(32)
-                    offset, dsize, size, type_byte, _, _, name_bytes = struct.unpack('<IIIBB2s16s', entry_data)
-                    name = name_bytes.decode('ascii').split('\x00')[0].upper()
+            with WAD2File(file_path) as wad:
+                for lump in wad:
+                    name = lump.name.upper()
 
                     # Store lump data as a tuple (offset, size) within the original WAD file
                     self.lumps[name] = {
                         'path': self.wad_file_path,
                         'type': 'existing',
-                        'data_info': (offset, size),
-                        'size': size
+                        'data_info': (lump.offset, lump.disksize),
+                        'lump_type': lump.type,
+                        'size': lump.size
                     }
                     self.listbox.insert(tk.END, name)
 
@@ -127,55 +120,22 @@ class WAD2Editor(tk.Tk):
             return
 
         try:
-            with open(save_path, 'wb') as wad_file:
-                # 1. Write a placeholder for the WAD header
-                wad_file.write(b"WAD2")
-                num_entries = len(self.lumps)
-                wad_file.write(struct.pack('<I', num_entries))
-                dir_offset_placeholder = wad_file.tell()
-                wad_file.write(b"\x00\x00\x00\x00")
-
-                wad_file_directory = []
-
-                # 2. Write the lump data and record directory entries
-                with open(self.wad_file_path, 'rb') if self.wad_file_path else open(os.devnull, 'rb') as source_wad:
+            # Existing lumps are read from the loaded WAD before the new one
+            # is written, in case both are the same file.
+            existing = {}
+            if self.wad_file_path:
+                with WAD2File(self.wad_file_path) as source_wad:
                     for name, lump_info in self.lumps.items():
-                        lump_offset = wad_file.tell()
-                        
-                        if lump_info['type'] == 'new':
-                            with open(lump_info['path'], 'rb') as lmp_file:
-                                lump_data = lmp_file.read()
-                                wad_file.write(lump_data)
-                                lump_size = len(lump_data)
-                        else:  # Existing lump
-                            source_wad.seek(lump_info['data_info'][0])
-                            lump_data = source_wad.read(lump_info['data_info'][1])
-                            wad_file.write(lump_data)
-                            lump_size = len(lump_data)
-
-                        entry = {
-                            'offset': lump_offset,
-                            'dsize': lump_size,
-                            'size': lump_size,
-                            'type': 0x45,  # Type for "console picture"
-                            'cmprs': 0,
-                            'dummy': 0,
-                            'name': name
-                        }
-                        wad_file_directory.append(entry)
-
-                # 3. Write the directory
-                dir_offset = wad_file.tell()
-                for entry in wad_file_directory:
-                    wad_file.write(struct.pack('<III', entry['offset'], entry['dsize'], entry['size']))
-                    wad_file.write(struct.pack('<B', entry['type']))
-                    wad_file.write(struct.pack('<B', entry['cmprs']))
-                    wad_file.write(struct.pack('<H', entry['dummy']))
-                    wad_file.write(entry['name'].encode('ascii').ljust(16, b'\x00'))
-
-                # 4. Update the WAD header with the directory offset
-                wad_file.seek(dir_offset_placeholder)
-                wad_file.write(struct.pack('<I', dir_offset))
+                        if lump_info['type'] == 'existing':
+                            with source_wad.read(name) as data:
+                                existing[name] = bytes(data)
+
+            with WAD2Writer(save_path) as wad_file:
+                for name, lump_info in self.lumps.items():
+                    if lump_info['type'] == 'new':
+                        wad_file.add_file(name, lump_info['path'], NEW_LUMP_TYPE)
+                    else:  # Existing lump keeps its original type
+                        wad_file.add_lump(name, existing[name], lump_info['lump_type'])
 
             messagebox.showinfo("Success", f".WAD file created successfully at {save_path}")
 
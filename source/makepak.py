@@ -1,43 +1,379 @@
 import sys
 import struct
 import os
- 
-#dummy class for stuffing the file headers into
-class FileEntry:
-    pass
- 
-#arguments are source directory, then target filename e.g. "pak1.pak"
-rootdir = sys.argv[1]
-pakfilename = sys.argv[2]
- 
-pakfile = open(pakfilename,"wb")
- 
-#write a dummy header to start with
-pakfile.write(struct.Struct("<4s2l").pack(b"PACK",0,0))
- 
-#walk the directory recursively, add the files and record the file entries
-offset = 12
-fileentries = []
-for root, subFolders, files in os.walk(rootdir):
-    for file in files:
-        entry = FileEntry()
-        impfilename = os.path.join(root,file)  
-        entry.filename = os.path.relpath(impfilename,rootdir).replace("\\","/")       
-        with open(impfilename, "rb") as importfile:
-            pakfile.write(importfile.read())
+import shutil
+import argparse
+import hashlib
+import json
+
+PAK_MAGIC = b"PACK"
+PAK_HEADER = struct.Struct("<4s2l")
+PAK_ENTRY = struct.Struct("<56s2l")
+PAK_NAME_SIZE = 56
+
+# Fallback copy size when the OS can't copy between file descriptors for us
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# The manifest sits next to the PAK ("pak0.pak.manifest") and records what
+# each entry was built from, so later builds only append what changed.
+MANIFEST_EXTENSION = ".manifest"
+MANIFEST_VERSION = 1
+
+class PakEntry:
+    """
+    One directory entry of a PAK file.
+    """
+    __slots__ = ("filename", "offset", "length")
+
+    def __init__(self, filename, offset, length):
+        self.filename = filename
+        self.offset = offset
+        self.length = length
+
+def collect_files(rootdir):
+    """
+    Walks a directory tree and returns (pak name, local path) pairs for
+    every file in it, using forward slashes for the PAK names.
+    """
+    found = []
+    for root, subFolders, files in os.walk(rootdir):
+        for file in files:
+            impfilename = os.path.join(root, file)
+            filename = os.path.relpath(impfilename, rootdir).replace("\\", "/")
+            found.append((filename, impfilename))
+    return found
+
+def copy_file_data(src, dst, length):
+    """
+    Copies 'length' bytes from the current position of src to the current
+    position of dst without holding the whole file in memory. Uses
+    copy_file_range/sendfile when the platform provides them, and bounded
+    chunked reads otherwise.
+
+    :param src: Unbuffered (raw) file object to read from.
+    :param dst: Unbuffered (raw) file object to write to.
+    :param length: Number of bytes to copy.
+    """
+    start = src.tell()
+
+    for fast_copy in (_copy_file_range, _sendfile):
+        remaining = length - (src.tell() - start)
+        if remaining <= 0:
+            return
+        try:
+            fast_copy(src, dst, remaining)
+        except (AttributeError, OSError):
+            # Not supported here (or by this filesystem); try the next method.
+            continue
+
+    remaining = length - (src.tell() - start)
+    if remaining > 0:
+        reader = _LimitedReader(src, remaining)
+        shutil.copyfileobj(reader, dst, COPY_CHUNK_SIZE)
+        if reader.remaining:
+            raise EOFError(f"file ended {reader.remaining} bytes early while copying")
+
+def _copy_file_range(src, dst, remaining):
+    while remaining > 0:
+        copied = os.copy_file_range(src.fileno(), dst.fileno(), min(remaining, 1 << 30))
+        if copied == 0:
+            raise EOFError(f"file ended {remaining} bytes early while copying")
+        remaining -= copied
+
+def _sendfile(src, dst, remaining):
+    while remaining > 0:
+        copied = os.sendfile(dst.fileno(), src.fileno(), src.tell(), min(remaining, 1 << 30))
+        if copied == 0:
+            raise EOFError(f"file ended {remaining} bytes early while copying")
+        src.seek(copied, os.SEEK_CUR)
+        remaining -= copied
+
+def write_all(f, data):
+    """
+    Writes a whole buffer to an unbuffered file, which may accept it in parts.
+    """
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+class _LimitedReader:
+    """
+    Presents the next 'length' bytes of a file to shutil.copyfileobj.
+    """
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def read(self, size):
+        data = self.f.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+def pack_directory(entries):
+    """
+    Serializes PAK directory entries into a single preallocated buffer.
+
+    :param entries: A list of PakEntry objects.
+    :return: The directory as a bytearray (64 bytes per entry).
+    """
+    directory = bytearray(PAK_ENTRY.size * len(entries))
+    for i, entry in enumerate(entries):
+        name = entry.filename.encode("ascii")
+        if len(name) >= PAK_NAME_SIZE:
+            raise ValueError(f"PAK entry name is longer than {PAK_NAME_SIZE - 1} characters: {entry.filename}")
+        PAK_ENTRY.pack_into(directory, i * PAK_ENTRY.size, name, entry.offset, entry.length)
+    return directory
+
+def build_pak(rootdir, pakfilename):
+    """
+    Packs every file under rootdir into a PAK file. File data is streamed
+    straight from disk into the archive.
+
+    :param rootdir: The directory to pack; paths in the PAK are relative to it.
+    :param pakfilename: The PAK file to create, e.g. "pak0.pak".
+    :return: The list of PakEntry objects written to the directory.
+    """
+    # Don't pack the archive into itself when it lives inside rootdir
+    pakpath = os.path.abspath(pakfilename)
+    files = [(filename, impfilename) for filename, impfilename in collect_files(rootdir)
+             if os.path.abspath(impfilename) != pakpath]
+    return write_pak(pakfilename, files)
+
+def write_pak(pakfilename, files):
+    """
+    Writes a PAK file from a list of (pak name, local path) pairs, in order.
+
+    :return: The list of PakEntry objects written to the directory.
+    """
+    fileentries = []
+
+    with open(pakfilename, "wb", buffering=0) as pakfile:
+        #write a dummy header to start with
+        write_all(pakfile, PAK_HEADER.pack(PAK_MAGIC, 0, 0))
+        offset = PAK_HEADER.size
+
+        for filename, impfilename in files:
+            with open(impfilename, "rb", buffering=0) as importfile:
+                length = os.fstat(importfile.fileno()).st_size
+                copy_file_data(importfile, pakfile, length)
+
+            fileentries.append(PakEntry(filename, offset, length))
+            offset += length
+
+        #after all the file data, write the list of entries
+        directory = pack_directory(fileentries)
+        write_all(pakfile, directory)
+
+        #return to the header and write the values correctly
+        pakfile.seek(0)
+        write_all(pakfile, PAK_HEADER.pack(PAK_MAGIC, offset, len(directory)))
+
+    return fileentries
+
+def hash_file(path):
+    """
+    Returns the SHA-1 hex digest of a file, read in bounded chunks.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_path(pakfilename):
+    return pakfilename + MANIFEST_EXTENSION
+
+def load_manifest(pakfilename):
+    """
+    Loads the sidecar manifest for a PAK file.
+
+    :return: The manifest dict, or None if it is missing, unreadable, or
+             no longer describes the PAK file on disk.
+    """
+    try:
+        with open(manifest_path(pakfilename), "r") as f:
+            manifest = json.load(f)
+        st = os.stat(pakfilename)
+    except (IOError, ValueError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    # The PAK was changed behind our back; its layout can't be trusted.
+    if manifest["pak"] != {"size": st.st_size, "mtime_ns": st.st_mtime_ns}:
+        return None
+    return manifest
+
+def save_manifest(pakfilename, records):
+    """
+    Writes the sidecar manifest for a freshly written PAK file.
+
+    :param records: Dict of PAK name -> {"size", "mtime_ns", "sha1", "offset"}.
+    """
+    st = os.stat(pakfilename)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "pak": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+        "entries": records,
+    }
+    tmpname = manifest_path(pakfilename) + ".tmp"
+    with open(tmpname, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmpname, manifest_path(pakfilename))
+
+def _scan_sources(rootdir, pakfilename, old_records):
+    """
+    Stats every source file and works out which ones changed since the
+    manifest was written. Content is only hashed when size or mtime differ.
+
+    :return: List of (pak name, local path, record, changed) tuples.
+    """
+    skip = {os.path.abspath(pakfilename), os.path.abspath(manifest_path(pakfilename))}
+    sources = []
+
+    for filename, impfilename in collect_files(rootdir):
+        if os.path.abspath(impfilename) in skip:
+            continue
+
+        st = os.stat(impfilename)
+        old = old_records.get(filename)
+
+        if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+            sources.append((filename, impfilename, dict(old), False))
+            continue
+
+        record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": hash_file(impfilename)}
+        if old and old["size"] == st.st_size and old["sha1"] == record["sha1"]:
+            # Touched but not modified; the existing lump is still good.
+            record["offset"] = old["offset"]
+            sources.append((filename, impfilename, record, False))
+        else:
+            sources.append((filename, impfilename, record, True))
+
+    return sources
+
+def _read_header(pakfile):
+    magic, dir_offset, dir_length = PAK_HEADER.unpack(pakfile.read(PAK_HEADER.size))
+    if magic != PAK_MAGIC:
+        raise ValueError("not a PAK file")
+    return dir_offset, dir_length
+
+def _compact_pak(pakfilename, entries):
+    """
+    Rewrites a PAK with only its live lumps, packed back to back. Lump data
+    is copied out of the existing archive, not re-read from the sources.
+    """
+    tmpname = pakfilename + ".tmp"
+
+    with open(pakfilename, "rb", buffering=0) as oldpak, open(tmpname, "wb", buffering=0) as newpak:
+        write_all(newpak, PAK_HEADER.pack(PAK_MAGIC, 0, 0))
+        offset = PAK_HEADER.size
+
+        for entry in entries:
+            oldpak.seek(entry.offset)
+            copy_file_data(oldpak, newpak, entry.length)
             entry.offset = offset
-            entry.length = importfile.tell()
-            offset = offset + entry.length
-        fileentries.append(entry)
-tablesize = 0
- 
-#after all the file data, write the list of entries
-for entry in fileentries:
-    pakfile.write(struct.Struct("<56s").pack(entry.filename.encode("ascii")))
-    pakfile.write(struct.Struct("<l").pack(entry.offset))
-    pakfile.write(struct.Struct("<l").pack(entry.length))
-    tablesize = tablesize + 64
- 
-#return to the header and write the values correctly
-pakfile.seek(0)
-pakfile.write(struct.Struct("<4s2l").pack(b"PACK",offset,tablesize))
\ No newline at end of file
+            offset += entry.length
+
+        directory = pack_directory(entries)
+        write_all(newpak, directory)
+        newpak.seek(0)
+        write_all(newpak, PAK_HEADER.pack(PAK_MAGIC, offset, len(directory)))
+
+    os.replace(tmpname, pakfilename)
+
+def update_pak(rootdir, pakfilename, compact=False):
+    """
+    Brings a PAK file up to date with rootdir, using its manifest to patch
+    it in place. New and changed files are appended after the existing
+    data, the directory is rewritten at the end, and unchanged lumps are
+    left where they are. Without a usable manifest this is a full build.
+
+    :param rootdir: The directory to pack.
+    :param pakfilename: The PAK file to create or update.
+    :param compact: Afterwards, rewrite the PAK without dead space left by
+                    replaced or deleted files.
+    :return: A dict with the new "entries" and "appended", "reused" and
+             "dead_bytes" counts.
+    """
+    manifest = load_manifest(pakfilename)
+
+    if manifest is None:
+        sources = _scan_sources(rootdir, pakfilename, {})
+        entries = write_pak(pakfilename, [(filename, impfilename) for filename, impfilename, _, _ in sources])
+        records = {}
+        for entry, (filename, _, record, _) in zip(entries, sources):
+            record["offset"] = entry.offset
+            records[filename] = record
+        save_manifest(pakfilename, records)
+        return {"entries": entries, "appended": len(entries), "reused": 0, "dead_bytes": 0}
+
+    sources = _scan_sources(rootdir, pakfilename, manifest["entries"])
+    entries = []
+    records = {}
+    appended = 0
+
+    with open(pakfilename, "r+b", buffering=0) as pakfile:
+        # Everything from the old directory onwards gets overwritten.
+        offset, _ = _read_header(pakfile)
+        pakfile.seek(offset)
+
+        for filename, impfilename, record, changed in sources:
+            if changed:
+                with open(impfilename, "rb", buffering=0) as importfile:
+                    copy_file_data(importfile, pakfile, record["size"])
+                record["offset"] = offset
+                offset += record["size"]
+                appended += 1
+
+            entries.append(PakEntry(filename, record["offset"], record["size"]))
+            records[filename] = record
+
+        directory = pack_directory(entries)
+        write_all(pakfile, directory)
+        pakfile.truncate()
+        pakfile.seek(0)
+        write_all(pakfile, PAK_HEADER.pack(PAK_MAGIC, offset, len(directory)))
+
+    dead_bytes = offset - PAK_HEADER.size - sum(entry.length for entry in entries)
+
+    if compact and dead_bytes:
+        _compact_pak(pakfilename, entries)
+        for entry in entries:
+            records[entry.filename]["offset"] = entry.offset
+        dead_bytes = 0
+
+    save_manifest(pakfilename, records)
+    return {"entries": entries, "appended": appended,
+            "reused": len(entries) - appended, "dead_bytes": dead_bytes}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Packs a directory tree into a Quake PAK file, updating it in place when possible."
+    )
+    parser.add_argument('rootdir', help='Source directory, e.g. "_pak0".')
+    parser.add_argument('pakfile', help='Target filename, e.g. "pak0.pak".')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the manifest and rebuild the PAK from scratch.')
+    parser.add_argument('--compact', action='store_true',
+                        help='Remove dead space left behind by replaced or deleted files.')
+
+    args = parser.parse_args()
+
+    try:
+        if args.full:
+            for stale in (args.pakfile, manifest_path(args.pakfile)):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        result = update_pak(args.rootdir, args.pakfile, compact=args.compact)
+    except (IOError, EOFError, ValueError) as e:
+        print(f"Error building {args.pakfile}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {len(result['entries'])} files to {args.pakfile} "
+          f"({result['appended']} added/changed, {result['reused']} unchanged, "
+          f"{result['dead_bytes']} bytes of dead space)")
+
+if __name__ == "__main__":
+    main()
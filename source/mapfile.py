@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+"""
+Map File Reader
+
+Parses Quake .map sources (the standard format and Valve 220) into
+compact, array-backed records: one entry per entity, brush and face,
+with face planes, texture indices and texture parameters in flat arrays.
+
+On top of that it reports what a map uses (which textures on how many
+faces, how many entities of each class, and the bounding boxes of the
+brushes) and can write per-map WADs holding only the textures a map
+uses, so qbsp loads and scans just those.
+
+Usage:
+    mapfile.py info [--json] bigroom.map ...
+    mapfile.py wads bigroom.map textures/ outdir/
+"""
+
+import sys
+import os
+import argparse
+import json
+import re
+from array import array
+from collections import Counter
+
+from wad2 import WAD2File, WAD2Writer, TYP_MIPTEX, clean_name
+
+_TOKEN_RE = re.compile(r'//[^\n]*|"[^"]*"|[{}()\[\]]|[^\s{}()\[\]"]+')
+
+# A point counts as inside a brush up to this far outside a face plane
+ON_EPSILON = 0.01
+
+class MapError(ValueError):
+    pass
+
+def _plane(points):
+    # Same winding as qbsp: the normal points out of the brush
+    (x0, y0, z0), (x1, y1, z1), (x2, y2, z2) = points
+    ax, ay, az = x0 - x1, y0 - y1, z0 - z1
+    bx, by, bz = x2 - x1, y2 - y1, z2 - z1
+    nx, ny, nz = ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx
+    length = (nx * nx + ny * ny + nz * nz) ** 0.5
+    if length == 0:
+        return None
+    nx, ny, nz = nx / length, ny / length, nz / length
+    return nx, ny, nz, nx * x1 + ny * y1 + nz * z1
+
+def _intersect(p, q, r):
+    # Cramer's rule for the point on all three planes
+    (a1, b1, c1, d1), (a2, b2, c2, d2), (a3, b3, c3, d3) = p, q, r
+    det = a1 * (b2 * c3 - b3 * c2) - b1 * (a2 * c3 - a3 * c2) + c1 * (a2 * b3 - a3 * b2)
+    if abs(det) < 1e-9:
+        return None
+    x = (d1 * (b2 * c3 - b3 * c2) - b1 * (d2 * c3 - d3 * c2) + c1 * (d2 * b3 - d3 * b2)) / det
+    y = (a1 * (d2 * c3 - d3 * c2) - d1 * (a2 * c3 - a3 * c2) + c1 * (a2 * d3 - a3 * d2)) / det
+    z = (a1 * (b2 * d3 - b3 * d2) - b1 * (a2 * d3 - a3 * d2) + d1 * (a2 * b3 - a3 * b2)) / det
+    return x, y, z
+
+class MapFile:
+    """
+    A parsed .map file.
+
+    Attributes:
+        entities: One dict of key/value pairs per entity.
+        entity_brushes: Index of each entity's first brush (plus one final
+            entry, so entity i owns brushes entity_brushes[i]:entity_brushes[i + 1]).
+        brush_faces: Index of each brush's first face, with the same
+            trailing entry.
+        points: The three plane points of every face, 9 floats per face.
+        face_textures: Index into textures for every face.
+        face_params: x offset, y offset, rotation, x scale, y scale per face.
+        face_axes: Valve 220 texture axes, 8 floats per face (u xyz offset,
+            v xyz offset); zeros for standard faces.
+        textures: Texture names, in order of first use.
+        valve: Whether any face used the Valve 220 format.
+
+    Raises:
+        MapError: If the file can't be parsed.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "r", encoding="latin-1") as f:
+            text = f.read()
+
+        self.entities = []
+        self.entity_brushes = array("l")
+        self.brush_faces = array("l")
+        self.points = array("d")
+        self.face_textures = array("l")
+        self.face_params = array("d")
+        self.face_axes = array("d")
+        self.textures = []
+        self.valve = False
+        self._texture_index = {}
+
+        try:
+            self._parse([t for t in _TOKEN_RE.findall(text) if not t.startswith("//")])
+        except MapError as e:
+            raise MapError(f"{filename}: {e}")
+        except IndexError:
+            raise MapError(f"{filename}: unexpected end of file")
+        except ValueError as e:
+            raise MapError(f"{filename}: {e}")
+
+        self.entity_brushes.append(len(self.brush_faces))
+        self.brush_faces.append(len(self.face_textures))
+
+    def _parse(self, tokens):
+        pos = 0
+        count = len(tokens)
+        while pos < count:
+            if tokens[pos] != "{":
+                raise MapError(f"expected '{{' at entity {len(self.entities)}, got '{tokens[pos]}'")
+            pos += 1
+
+            entity = {}
+            self.entities.append(entity)
+            self.entity_brushes.append(len(self.brush_faces))
+
+            while tokens[pos] != "}":
+                token = tokens[pos]
+                if token == "{":
+                    pos = self._parse_brush(tokens, pos + 1)
+                elif token.startswith('"'):
+                    entity[token[1:-1]] = tokens[pos + 1][1:-1]
+                    pos += 2
+                else:
+                    raise MapError(f"unexpected '{token}' in entity {len(self.entities) - 1}")
+            pos += 1
+
+    def _parse_brush(self, tokens, pos):
+        self.brush_faces.append(len(self.face_textures))
+        points = self.points
+        while tokens[pos] != "}":
+            if tokens[pos] != "(":
+                raise MapError(f"brush {len(self.brush_faces) - 1} is not in a supported format "
+                               f"(got '{tokens[pos]}')")
+            # ( x y z ) ( x y z ) ( x y z )
+            for i in range(3):
+                if tokens[pos] != "(" or tokens[pos + 4] != ")":
+                    raise MapError(f"bad plane points in brush {len(self.brush_faces) - 1}")
+                points.extend((float(tokens[pos + 1]), float(tokens[pos + 2]), float(tokens[pos + 3])))
+                pos += 5
+
+            name = tokens[pos]
+            pos += 1
+            index = self._texture_index.get(name)
+            if index is None:
+                index = self._texture_index[name] = len(self.textures)
+                self.textures.append(name)
+            self.face_textures.append(index)
+
+            if tokens[pos] == "[":
+                # Valve 220: [ ux uy uz uoffset ] [ vx vy vz voffset ] rotation xscale yscale
+                self.valve = True
+                if tokens[pos + 5] != "]" or tokens[pos + 6] != "[" or tokens[pos + 11] != "]":
+                    raise MapError(f"bad texture axes in brush {len(self.brush_faces) - 1}")
+                u = [float(t) for t in tokens[pos + 1:pos + 5]]
+                v = [float(t) for t in tokens[pos + 7:pos + 11]]
+                self.face_axes.extend(u + v)
+                pos += 12
+                rotation, xscale, yscale = (float(t) for t in tokens[pos:pos + 3])
+                self.face_params.extend((u[3], v[3], rotation, xscale, yscale))
+                pos += 3
+            else:
+                self.face_axes.extend((0.0,) * 8)
+                self.face_params.extend(float(t) for t in tokens[pos:pos + 5])
+                pos += 5
+
+            # Skip any extra values (e.g. Quake 2 surface flags)
+            while tokens[pos] not in ("(", "}"):
+                pos += 1
+        return pos + 1
+
+    def __len__(self):
+        return len(self.entities)
+
+    @property
+    def brush_count(self):
+        return len(self.brush_faces) - 1
+
+    @property
+    def face_count(self):
+        return len(self.face_textures)
+
+    def texture_usage(self):
+        """
+        Returns {texture name: number of faces using it}.
+        """
+        counts = Counter(self.face_textures)
+        return {self.textures[index]: count for index, count in counts.items()}
+
+    def class_counts(self):
+        """
+        Returns {classname: number of entities}.
+        """
+        return dict(Counter(entity.get("classname", "") for entity in self.entities))
+
+    def brush_bounds(self, brush):
+        """
+        Returns (mins, maxs) of a brush, from the corners where its face
+        planes meet, or None if the brush is degenerate.
+        """
+        planes = []
+        for face in range(self.brush_faces[brush], self.brush_faces[brush + 1]):
+            p = self.points[face * 9:face * 9 + 9]
+            plane = _plane((p[0:3], p[3:6], p[6:9]))
+            if plane is not None:
+                planes.append(plane)
+
+        mins = [float("inf")] * 3
+        maxs = [float("-inf")] * 3
+        n = len(planes)
+        for i in range(n):
+            for j in range(i + 1, n):
+                for k in range(j + 1, n):
+                    corner = _intersect(planes[i], planes[j], planes[k])
+                    if corner is None:
+                        continue
+                    x, y, z = corner
+                    if all(a * x + b * y + c * z - d <= ON_EPSILON for a, b, c, d in planes):
+                        for axis in range(3):
+                            mins[axis] = min(mins[axis], corner[axis])
+                            maxs[axis] = max(maxs[axis], corner[axis])
+
+        if mins[0] == float("inf"):
+            return None
+        return tuple(mins), tuple(maxs)
+
+    def entity_bounds(self, entity):
+        """
+        Returns (mins, maxs) of an entity's brushes, or of its origin for a
+        point entity, or None if it has neither.
+        """
+        boxes = [box for box in (self.brush_bounds(b) for b in
+                 range(self.entity_brushes[entity], self.entity_brushes[entity + 1])) if box]
+        if not boxes:
+            try:
+                origin = tuple(float(v) for v in self.entities[entity]["origin"].split())
+            except (KeyError, ValueError):
+                return None
+            return (origin, origin) if len(origin) == 3 else None
+
+        mins = tuple(min(box[0][axis] for box in boxes) for axis in range(3))
+        maxs = tuple(max(box[1][axis] for box in boxes) for axis in range(3))
+        return mins, maxs
+
+    def report(self):
+        """
+        Returns a JSON-friendly summary of the map.
+        """
+        world = self.entity_bounds(0) if self.entities else None
+        return {
+            "map": self.filename,
+            "entities": len(self.entities),
+            "brushes": self.brush_count,
+            "faces": self.face_count,
+            "format": "valve220" if self.valve else "standard",
+            "bounds": world and {"mins": list(world[0]), "maxs": list(world[1])},
+            "classes": self.class_counts(),
+            "textures": self.texture_usage(),
+        }
+
+def write_map_wads(mapfile, wadpath, outdir):
+    """
+    Writes a copy of every WAD in wadpath into outdir, each holding only the
+    textures mapfile uses, so qbsp given outdir as its -wadpath sees the
+    same textures as before. A texture found in several WADs only goes into
+    the first, as qbsp would pick that one. Lumps that aren't textures (a
+    PALETTE, say) are always copied, since a compiler may read them.
+
+    Returns:
+        (list of textures written, list of textures no WAD has)
+    """
+    wanted = {clean_name(name) for name in mapfile.textures}
+    found = set()
+    os.makedirs(outdir, exist_ok=True)
+
+    for path in sorted(os.path.join(wadpath, n) for n in os.listdir(wadpath) if n.lower().endswith(".wad")):
+        with WAD2File(path) as wad, WAD2Writer(os.path.join(outdir, os.path.basename(path))) as out:
+            for lump in wad:
+                lump_type = lump.type or TYP_MIPTEX
+                name = clean_name(lump.name)
+                if lump_type == TYP_MIPTEX:
+                    if name not in wanted or name in found:
+                        continue
+                    found.add(name)
+                with wad.read(lump) as data:
+                    out.add_lump(lump.name, data, lump_type)
+
+    return sorted(found), sorted(wanted - found)
+
+def main():
+    """
+    Main function to parse command-line arguments and run a subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        description="Reports on Quake .map files and writes per-map texture WADs."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info_cmd = commands.add_parser('info', help='Print texture usage, entity classes and bounds.')
+    info_cmd.add_argument('maps', nargs='+', help='.map files.')
+    info_cmd.add_argument('--json', action='store_true', help='Print JSON instead of text.')
+
+    wads_cmd = commands.add_parser('wads', help="Write WADs with just a map's textures.")
+    wads_cmd.add_argument('map', help='The .map file.')
+    wads_cmd.add_argument('wadpath', help='Directory of the full texture WADs.')
+    wads_cmd.add_argument('outdir', help='Directory for the per-map WADs.')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'info':
+            reports = [MapFile(path).report() for path in args.maps]
+            if args.json:
+                print(json.dumps(reports, indent=1))
+                return
+            for report in reports:
+                print(f"{report['map']}: {report['entities']} entities, {report['brushes']} brushes, "
+                      f"{report['faces']} faces ({report['format']})")
+                if report["bounds"]:
+                    print(f"  bounds {report['bounds']['mins']} - {report['bounds']['maxs']}")
+                for name, count in sorted(report["classes"].items()):
+                    print(f"  {count:6d}  {name}")
+                for name, count in sorted(report["textures"].items()):
+                    print(f"  {count:6d}  faces of {name}")
+
+        elif args.command == 'wads':
+            written, missing = write_map_wads(MapFile(args.map), args.wadpath, args.outdir)
+            print(f"Wrote {len(written)} textures to {args.outdir}")
+            for name in missing:
+                print(f"Warning: texture '{name}' is not in any WAD in {args.wadpath}", file=sys.stderr)
+
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+"""
+Music Track Builder
+
+Checks the soundtrack in music/ and transcodes it for the PAK tree.
+
+Engines play CD audio replacements named by track number, and track 1 is
+the data track, so the music must be track02 through track11. Checking
+reports:
+
+- errors: files that aren't trackNN, tracks outside 02-11, and the same
+  track given twice (e.g. track03.wav and track03.flac)
+- warnings: gaps between track02 and the last track
+
+Tracks are then transcoded with ffmpeg to one target format and bitrate
+(Ogg Vorbis, 128 kbit/s by default), several at a time. Sources already
+in the target format are copied rather than re-encoded. Each output is
+kept in the build cache under a hash of its source, which is read in
+chunks, so editing the soundtrack only re-encodes the tracks that changed.
+
+Usage:
+    music.py [--check] [-o outdir] [--format ogg] [--bitrate 128k] [-j N] [music_dir]
+"""
+
+import sys
+import os
+import argparse
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from buildcache import BuildCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, cached, file_digest
+from imgbatch import ConvertResult, add_jobs_argument, report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MUSIC_DIR = os.path.join(ROOT, "music")
+
+FIRST_TRACK = 2
+LAST_TRACK = 11
+
+SOURCE_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+
+# ffmpeg encoder arguments per target format
+TARGET_FORMATS = {
+    "ogg": ["-c:a", "libvorbis"],
+    "mp3": ["-c:a", "libmp3lame"],
+    "flac": ["-c:a", "flac"],
+    "wav": ["-c:a", "pcm_s16le"],
+}
+LOSSLESS_FORMATS = ("flac", "wav")
+
+DEFAULT_FORMAT = "ogg"
+DEFAULT_BITRATE = "128k"
+
+_TRACK_RE = re.compile(r"track(\d\d)$")
+
+def find_tracks(music_dir):
+    """
+    Finds and checks the tracks in a music directory.
+
+    Returns:
+        (tracks, problems): {track number: source path}, and a list of
+        (level, message) with level 'error' or 'warning'.
+    """
+    tracks = {}
+    problems = []
+    for name in sorted(os.listdir(music_dir)):
+        path = os.path.join(music_dir, name)
+        stem, extension = os.path.splitext(name)
+        if not os.path.isfile(path) or extension.lower() not in SOURCE_EXTENSIONS:
+            continue
+
+        match = _TRACK_RE.match(stem.lower())
+        if not match:
+            problems.append(("error", f"{name}: music files must be named track02 through track{LAST_TRACK:02d}"))
+            continue
+
+        number = int(match.group(1))
+        if not FIRST_TRACK <= number <= LAST_TRACK:
+            problems.append(("error", f"{name}: track {number} is outside {FIRST_TRACK:02d}-{LAST_TRACK:02d}"))
+        elif number in tracks:
+            problems.append(("error", f"{name}: track {number:02d} is already {os.path.basename(tracks[number])}"))
+        else:
+            tracks[number] = path
+
+    if tracks:
+        missing = [n for n in range(FIRST_TRACK, max(tracks)) if n not in tracks]
+        if missing:
+            problems.append(("warning", f"missing track{', track'.join(f'{n:02d}' for n in missing)}"))
+    return tracks, problems
+
+def ffmpeg_path():
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+def transcode(source, output, target=DEFAULT_FORMAT, bitrate=DEFAULT_BITRATE):
+    """
+    Writes one track in the target format, copying it if the source
+    already is in that format.
+
+    Raises:
+        ValueError: If ffmpeg is missing or fails.
+    """
+    tmpname = output + ".tmp"
+    if os.path.splitext(source)[1].lower() == "." + target:
+        shutil.copyfile(source, tmpname)
+    else:
+        argv = [ffmpeg_path(), "-v", "error", "-y", "-i", source, "-vn", "-map_metadata", "-1"]
+        argv += TARGET_FORMATS[target]
+        if target not in LOSSLESS_FORMATS:
+            argv += ["-b:a", bitrate]
+        argv += ["-f", target, tmpname]
+        try:
+            proc = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except FileNotFoundError:
+            raise ValueError("'ffmpeg' was not found; is it on your PATH?")
+        if proc.returncode != 0:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise ValueError(f"ffmpeg failed on {source}: {proc.stdout.decode(errors='replace').strip()}")
+    os.replace(tmpname, output)
+
+def _build_track(outdir, target, bitrate, cache_dir, cache_size, encoder, item):
+    number, source = item
+    name = f"track{number:02d}.{target}"
+    output = os.path.join(outdir, name)
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+    try:
+        # Re-encoding depends on the encoder, so its digest is part of the key
+        extra = (target, bitrate)
+        if not source.lower().endswith("." + target) and encoder:
+            extra += (encoder,)
+        cached(cache, [os.path.abspath(__file__)], [source], outdir, [name],
+               partial(transcode, source, output, target, bitrate), extra=extra)
+        return ConvertResult(source, output=output)
+    except (IOError, ValueError) as e:
+        return ConvertResult(source, error=str(e))
+
+def build_music(tracks, outdir, target=DEFAULT_FORMAT, bitrate=DEFAULT_BITRATE, jobs=None,
+                cache_dir=DEFAULT_CACHE_DIR, cache_size=DEFAULT_MAX_BYTES):
+    """
+    Transcodes {track number: source} into outdir, in parallel, reusing
+    cached outputs unless cache_dir is None. Outputs for tracks that are
+    no longer in the soundtrack are removed.
+
+    Returns:
+        A ConvertResult per track, in track order.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    wanted = {f"track{number:02d}.{target}" for number in tracks}
+    for name in os.listdir(outdir):
+        if _TRACK_RE.match(os.path.splitext(name)[0]) and name not in wanted:
+            os.remove(os.path.join(outdir, name))
+
+    # Hash the ffmpeg binary once here rather than once per track
+    encoder = None
+    if cache_dir and shutil.which("ffmpeg") and any(
+            not source.lower().endswith("." + target) for source in tracks.values()):
+        encoder = file_digest(shutil.which("ffmpeg"))
+
+    build = partial(_build_track, outdir, target, bitrate, cache_dir, cache_size, encoder)
+    items = sorted(tracks.items())
+    if jobs == 1 or len(items) < 2:
+        return [build(item) for item in items]
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        return list(pool.map(build, items))
+
+def main():
+    """
+    Main function to parse command-line arguments and build the soundtrack.
+    """
+    parser = argparse.ArgumentParser(
+        description="Checks music/ for track02-track11 and transcodes the tracks."
+    )
+    parser.add_argument('music_dir', nargs='?', default=DEFAULT_MUSIC_DIR,
+                        help='Directory of source tracks (default: music/).')
+    parser.add_argument('-o', '--output', default=os.path.join(ROOT, "_pak0", "music"),
+                        help='Where the transcoded tracks go (default: _pak0/music).')
+    parser.add_argument('--check', action='store_true', help='Only check the track names.')
+    parser.add_argument('--format', choices=sorted(TARGET_FORMATS), default=DEFAULT_FORMAT,
+                        help=f'Target format (default: {DEFAULT_FORMAT}).')
+    parser.add_argument('--bitrate', default=DEFAULT_BITRATE,
+                        help=f'Target bitrate for lossy formats (default: {DEFAULT_BITRATE}).')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Build cache directory.')
+    parser.add_argument('--no-cache', action='store_true', help='Transcode every track, ignoring the cache.')
+    add_jobs_argument(parser)
+
+    args = parser.parse_args()
+
+    try:
+        tracks, problems = find_tracks(args.music_dir)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for level, message in problems:
+        print(f"{level}: {message}", file=sys.stderr)
+    if any(level == "error" for level, _ in problems):
+        sys.exit(1)
+
+    print(f"{len(tracks)} music tracks")
+    if args.check or not tracks:
+        return
+
+    results = build_music(tracks, args.output, args.format, args.bitrate, args.jobs,
+                          None if args.no_cache else args.cache_dir)
+    if report(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
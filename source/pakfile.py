@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+"""
+PAK File Reader
+
+Random-access reader for Quake PAK archives, the counterpart to makepak.py.
+
+The archive is memory-mapped and only its directory is parsed, so even a
+multi-hundred-megabyte pak0.pak can be listed, checked or partially
+extracted without being loaded into memory. Lumps are returned as
+zero-copy memoryview slices of the mapping.
+
+Usage:
+    pakfile.py list pak0.pak
+    pakfile.py extract pak0.pak [-o outdir] [name ...]
+    pakfile.py cat pak0.pak name > file
+"""
+
+import sys
+import os
+import argparse
+import mmap
+from array import array
+
+from makepak import PAK_MAGIC, PAK_HEADER, PAK_ENTRY
+
+class PakFile:
+    """
+    A memory-mapped, read-only PAK archive.
+
+    Args:
+        filename: Path to the PAK file.
+
+    Raises:
+        ValueError: If the file is not a well-formed PAK archive.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < PAK_HEADER.size:
+                raise ValueError(f"{filename} is too small to be a PAK file")
+
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+            self._read_directory(size)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_directory(self, size):
+        magic, dir_offset, dir_length = PAK_HEADER.unpack_from(self._map, 0)
+        if magic != PAK_MAGIC:
+            raise ValueError(f"{self.filename} is not a PAK file")
+        if dir_length % PAK_ENTRY.size or dir_offset < 0 or dir_offset + dir_length > size:
+            raise ValueError(f"{self.filename} has a corrupt directory")
+
+        count = dir_length // PAK_ENTRY.size
+
+        # Compact index: names in a list, offsets and lengths in flat arrays.
+        self.names = []
+        self.offsets = array("l", [0]) * count
+        self.lengths = array("l", [0]) * count
+        self._lookup = {}
+
+        for i, (name, offset, length) in enumerate(PAK_ENTRY.iter_unpack(self._view[dir_offset:dir_offset + dir_length])):
+            name = name.split(b"\x00", 1)[0].decode("ascii")
+            if offset < 0 or length < 0 or offset + length > size:
+                raise ValueError(f"{self.filename}: entry '{name}' points outside the file")
+
+            self.names.append(name)
+            self.offsets[i] = offset
+            self.lengths[i] = length
+            # Like the engine, the first entry of a duplicated name wins.
+            self._lookup.setdefault(name, i)
+
+    def close(self):
+        """
+        Releases the mapping. Slices handed out by read() must be released first.
+        """
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._lookup
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def entries(self):
+        """
+        Yields (name, offset, length) for every directory entry, in order.
+        """
+        return zip(self.names, self.offsets, self.lengths)
+
+    def read(self, name: str) -> memoryview:
+        """
+        Returns a lump's contents as a zero-copy slice of the mapping.
+
+        Raises:
+            KeyError: If the PAK has no entry with that name.
+        """
+        i = self._lookup[name]
+        offset = self.offsets[i]
+        return self._view[offset:offset + self.lengths[i]]
+
+    def extract(self, name: str, outdir: str) -> str:
+        """
+        Writes one lump to outdir, recreating its directory path.
+
+        Returns:
+            The path of the written file.
+        """
+        parts = name.split("/")
+        if name.startswith("/") or ".." in parts:
+            raise ValueError(f"refusing to extract unsafe path '{name}'")
+
+        path = os.path.join(outdir, *parts)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self.read(name) as data, open(path, "wb") as f:
+            f.write(data)
+        return path
+
+def main():
+    """
+    Main function to parse command-line arguments and run a subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        description="Lists, extracts and prints files from Quake PAK archives."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_cmd = commands.add_parser('list', help='List the directory of a PAK file.')
+    list_cmd.add_argument('pakfile', help='The PAK file to read.')
+
+    extract_cmd = commands.add_parser('extract', help='Extract files from a PAK file.')
+    extract_cmd.add_argument('pakfile', help='The PAK file to read.')
+    extract_cmd.add_argument('names', nargs='*', help='Entries to extract (default: all).')
+    extract_cmd.add_argument('-o', '--outdir', default='.', help='Output directory (default: current).')
+
+    cat_cmd = commands.add_parser('cat', help='Write one file from a PAK file to stdout.')
+    cat_cmd.add_argument('pakfile', help='The PAK file to read.')
+    cat_cmd.add_argument('name', help='The entry to print.')
+
+    args = parser.parse_args()
+
+    try:
+        with PakFile(args.pakfile) as pak:
+            if args.command == 'list':
+                for name, offset, length in pak.entries():
+                    print(f"{offset:10d} {length:10d}  {name}")
+                print(f"{len(pak)} files")
+
+            elif args.command == 'extract':
+                for name in args.names or pak.names:
+                    print(f"writing {pak.extract(name, args.outdir)}")
+
+            elif args.command == 'cat':
+                with pak.read(args.name) as data:
+                    sys.stdout.buffer.write(data)
+                sys.stdout.buffer.flush()
+
+    except KeyError as e:
+        print(f"Error: {args.pakfile} has no entry {e}", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, ValueError) as e:
+        print(f"Error reading {args.pakfile}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+"""
+Palette I/O
+
+Reads and writes a 256-color palette in every format the project deals
+with, always through one canonical buffer: 768 bytes of RGB, entry 0
+first. Converting between two formats is one read and one write, with no
+intermediate files.
+
+    .lmp  Quake palette lump (raw 768 bytes)
+    .pal  raw 768 bytes; JASC-PAL text and RIFF PAL are also read
+    .act  Adobe color table (768 bytes, or 772 with a color count)
+    .gpl  GIMP palette
+    .tga  16x16 (or 256x1) uncompressed 24/32-bit image, bottom-up
+    .png  16x16 RGB image, pixel n drawn in color n (needs Pillow);
+          any image is read as its first 256 pixels in row order
+
+Usage:
+    palette.py convert input output
+"""
+
+import sys
+import os
+import argparse
+import struct
+
+# Pillow is only needed for .png palettes.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# NumPy is optional; palette_array needs it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PALETTE_SIZE = 768
+TGA_HEADER = struct.Struct("<BBBHHBHHHHBB")
+
+def palette_array(palette):
+    """
+    Returns a read-only (256, 3) uint8 NumPy view of a palette buffer,
+    without copying it.
+    """
+    return np.frombuffer(palette, dtype=np.uint8).reshape(256, 3)
+
+def palette_colors(palette):
+    """
+    Returns the palette as a list of 256 (r, g, b) tuples.
+    """
+    view = memoryview(palette)
+    return [tuple(view[i:i + 3]) for i in range(0, PALETTE_SIZE, 3)]
+
+def _check_size(palette, filename):
+    if len(palette) != PALETTE_SIZE:
+        raise ValueError(f"{filename} holds {len(palette)} bytes of palette, not {PALETTE_SIZE}")
+    return bytes(palette)
+
+def _pad(colors, filename):
+    # Short palettes are padded with black; long ones are an error
+    if len(colors) > PALETTE_SIZE:
+        raise ValueError(f"{filename} has more than 256 colors")
+    return bytes(colors).ljust(PALETTE_SIZE, b"\x00")
+
+# --- Readers: filename -> 768-byte palette ---
+
+def read_lmp(filename):
+    with open(filename, "rb") as f:
+        return _check_size(f.read(), filename)
+
+def read_pal(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    if data.startswith(b"JASC-PAL"):
+        lines = data.decode("latin-1").split()
+        count = int(lines[2])
+        return _pad([int(value) for value in lines[3:3 + count * 3]], filename)
+
+    if data.startswith(b"RIFF") and data[8:12] == b"PAL ":
+        # The 'data' chunk: version, count, then r, g, b, flags per entry
+        pos = data.find(b"data", 12)
+        if pos < 0:
+            raise ValueError(f"{filename} has no palette data chunk")
+        count = struct.unpack_from("<H", data, pos + 10)[0]
+        entries = memoryview(data)[pos + 12:pos + 12 + count * 4]
+        colors = bytearray(len(entries) // 4 * 3)
+        for channel in range(3):
+            colors[channel::3] = entries[channel::4]
+        return _pad(colors, filename)
+
+    return _check_size(data, filename)
+
+def read_act(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    if len(data) == PALETTE_SIZE + 4:
+        # Trailing big-endian color count and transparent index
+        count = struct.unpack_from(">H", data, PALETTE_SIZE)[0]
+        return _pad(data[:min(count, 256) * 3], filename)
+    return _check_size(data, filename)
+
+def read_gpl(filename, pad=True):
+    # With pad=False the parsed colors come back as they are, however many
+    colors = []
+    with open(filename, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", "GIMP Palette", "Name:", "Columns:")):
+                continue
+
+            parts = line.split()
+            if len(parts) >= 3:
+                try:
+                    colors.extend(int(value) for value in parts[:3])
+                except ValueError:
+                    # Skip lines that don't contain valid RGB values
+                    continue
+    if not colors:
+        raise ValueError(f"Could not read any colors from {filename}.")
+    return _pad(colors, filename) if pad else bytes(colors)
+
+def read_tga(filename):
+    with open(filename, "rb") as f:
+        header = f.read(TGA_HEADER.size)
+        if len(header) < TGA_HEADER.size:
+            raise ValueError(f"{filename} is not a valid TGA file.")
+
+        (id_length, cmap_type, image_type, _, cmap_length, cmap_bits,
+         _, _, width, height, bpp, descriptor) = TGA_HEADER.unpack(header)
+
+        if image_type != 2:
+            raise ValueError(f"{filename} should be an uncompressed, RGB image.")
+        if bpp not in (24, 32):
+            raise ValueError(f"{filename} is not 24 or 32 bit in depth.")
+        if width * height != 256 or width not in (16, 256):
+            raise ValueError(f"{filename} is not a 16x16 or 256x1 image.")
+
+        # Skip the image ID and any (unused) color map
+        f.seek(id_length + (cmap_length * ((cmap_bits + 7) // 8) if cmap_type else 0), os.SEEK_CUR)
+        pixel_size = bpp // 8
+        data = f.read(256 * pixel_size)
+        if len(data) != 256 * pixel_size:
+            raise ValueError(f"Could not read {256 * pixel_size} bytes of image data from {filename}.")
+
+    # Rows are stored bottom-up unless the descriptor says otherwise
+    if not descriptor & 0x20:
+        row_size = width * pixel_size
+        data = b"".join(data[row * row_size:(row + 1) * row_size] for row in range(height - 1, -1, -1))
+
+    # BGR(A) -> RGB
+    palette = bytearray(PALETTE_SIZE)
+    palette[0::3] = data[2::pixel_size]
+    palette[1::3] = data[1::pixel_size]
+    palette[2::3] = data[0::pixel_size]
+    return bytes(palette)
+
+def palette_from_image(img):
+    """
+    Returns the palette drawn in a Pillow image: its first 256 pixels in
+    row order, padded with black if there are fewer.
+    """
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img.tobytes()[:PALETTE_SIZE].ljust(PALETTE_SIZE, b"\x00")
+
+def read_png(filename):
+    _require_pillow()
+    with Image.open(filename) as img:
+        return palette_from_image(img)
+
+# --- Writers: (768-byte palette, filename) ---
+
+def write_raw(palette, filename):
+    with open(filename, "wb") as f:
+        f.write(palette)
+
+def write_gpl(palette, filename):
+    name = os.path.splitext(os.path.basename(filename))[0]
+    lines = ["GIMP Palette", f"Name: {name}", "Columns: 16", "#"]
+    lines += [f"{r:3d} {g:3d} {b:3d}\tIndex {i}" for i, (r, g, b) in enumerate(palette_colors(palette))]
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def write_tga(palette, filename):
+    # 16x16, 24-bit, bottom-up, the layout tga2pal has always expected
+    bgr = bytearray(PALETTE_SIZE)
+    bgr[0::3] = palette[2::3]
+    bgr[1::3] = palette[1::3]
+    bgr[2::3] = palette[0::3]
+    row_size = 16 * 3
+    pixels = b"".join(bgr[row * row_size:(row + 1) * row_size] for row in range(15, -1, -1))
+    with open(filename, "wb") as f:
+        f.write(TGA_HEADER.pack(0, 0, 2, 0, 0, 0, 0, 0, 16, 16, 24, 0))
+        f.write(pixels)
+
+def write_png(palette, filename, colors=256):
+    # Only the first `colors` pixels are drawn; the rest stay in color 0.
+    # Saved as RGB, not indexed, so png2pal can read it back.
+    _require_pillow()
+    img = Image.new("P", (16, 16))
+    img.putpalette(palette)
+    img.frombytes(bytes(range(colors)).ljust(256, b"\x00"))
+    img.convert("RGB").save(filename)
+
+def _require_pillow():
+    if Image is None:
+        raise ValueError("PNG palettes need the Pillow library (pip install Pillow).")
+
+READERS = {
+    ".lmp": read_lmp,
+    ".pal": read_pal,
+    ".act": read_act,
+    ".gpl": read_gpl,
+    ".tga": read_tga,
+    ".png": read_png,
+}
+
+WRITERS = {
+    ".lmp": write_raw,
+    ".pal": write_raw,
+    ".act": write_raw,
+    ".gpl": write_gpl,
+    ".tga": write_tga,
+    ".png": write_png,
+}
+
+def _format(filename, table):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in table:
+        raise ValueError(f"{filename}: unknown palette format (expected one of {', '.join(table)})")
+    return table[extension]
+
+def read_palette(filename):
+    """
+    Reads a palette file, choosing the format by its extension.
+
+    Returns:
+        The palette as 768 bytes of RGB.
+
+    Raises:
+        ValueError: If the format is unknown or the file is malformed.
+    """
+    return _format(filename, READERS)(filename)
+
+def write_palette(palette, filename):
+    """
+    Writes a 768-byte palette, choosing the format by the file's extension.
+    """
+    _format(filename, WRITERS)(_check_size(palette, "palette"), filename)
+
+def convert_palette(input_filename, output_filename):
+    write_palette(read_palette(input_filename), output_filename)
+
+def main():
+    """
+    Main function to parse command-line arguments and convert palettes.
+    """
+    parser = argparse.ArgumentParser(
+        description="Converts a 256-color palette between .lmp, .pal, .act, .gpl, .tga and .png."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert_cmd = commands.add_parser('convert', help='Convert a palette; formats come from the extensions.')
+    convert_cmd.add_argument('input', help='The palette to read.')
+    convert_cmd.add_argument('output', help='The palette to write.')
+
+    args = parser.parse_args()
+
+    try:
+        convert_palette(args.input, args.output)
+    except FileNotFoundError:
+        print(f"Error: couldn't find {args.input}", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"writing {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@
 """
 
 import sys
-from PIL import Image
+
+from palette import read_png, write_png
 
 def process_and_resize_image(input_path, output_path):
     """
@@ -13,31 +14,14 @@ def process_and_resize_image(input_path, output_path):
         input_path (str): The path to the input image file.
         output_path (str): The path to save the processed output image.
     """
-    # Open the input image
     try:
-        with Image.open(input_path) as img:
-            # Get the size of the original image
-            width, height = img.size
-
-            # Create a new 16x16 image with a black background
-            new_img = Image.new('RGB', (16, 16), (0, 0, 0))
-
-            # Calculate the number of pixels to copy
-            num_pixels_to_copy = min(width * height, 256)
-
-            # Get the pixel data from the original image
-            original_pixels = list(img.getdata())
-
-            # Paste the original pixels into the new image
-            new_img.putdata(original_pixels[:num_pixels_to_copy])
-
-            # Save the new image as a PNG
-            new_img.save(output_path, 'PNG')
-            print(f"Image successfully processed and saved to {output_path}")
+        # The first 256 pixels are the palette; missing ones are black
+        write_png(read_png(input_path), output_path)
+        print(f"Image successfully processed and saved to {output_path}")
 
     except FileNotFoundError:
         print(f"Error: The file at {input_path} was not found.")
-    except Exception as e:
+    except (IOError, ValueError) as e:
         print(f"An error occurred: {e}")
 
 if __name__ == '__main__':
@@ -55,4 +39,4 @@ if __name__ == '__main__':
         process_and_resize_image(input_file, output_file)
     else:
         print("Usage: Drag and drop an image file onto this script, or run it from the command line with a file path as an argument.")
-        print("Example: python your_script_name.py gmpalette-raw.png")
\ No newline at end of file
+        print("Example: python your_script_name.py gmpalette-raw.png")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""
+Palette Index
+
+Nearest-color lookups against a Quake 256-color palette, shared by all of
+the tools that quantize 24-bit RGB to palette indices.
+
+A PaletteIndex is built once from a 768-byte palette. Single lookups use a
+small k-d tree with a memo table. When NumPy is installed, a full 256^3
+RGB->index cube can be built (and persisted next to the palette), which
+turns quantizing a whole image into one array lookup.
+
+Every lookup answers exactly like colorgen.convert_24_to_8: the smallest
+squared RGB distance wins, and ties resolve to the lowest palette index.
+"""
+
+import sys
+import os
+import argparse
+
+from palette import read_palette
+
+# NumPy is optional; without it only the k-d tree path is available.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+QUAKE_PALETTE_SIZE = 768
+CUBE_SIZE = 256 * 256 * 256
+CUBE_EXTENSION = ".cube"
+
+# The cube is solved in 8x8x8 cells; each cell only tests palette entries
+# that can possibly be nearest to some point inside it.
+_CELL = 8
+_CELLS_PER_AXIS = 256 // _CELL
+
+class PaletteIndex:
+    """
+    Nearest-color index for one palette.
+
+    Args:
+        palette: The 256-color palette (any sequence of 768 byte values).
+        indices: Palette entries lookups may return (default: all 256),
+            e.g. range(224) to keep away from the fullbright colors.
+    """
+
+    def __init__(self, palette, indices=None):
+        if len(palette) != QUAKE_PALETTE_SIZE:
+            raise ValueError(f"palette must be {QUAKE_PALETTE_SIZE} bytes, got {len(palette)}")
+
+        self.palette = bytes(palette)
+        self.indices = sorted(set(range(256) if indices is None else indices))
+        if not self.indices or not 0 <= self.indices[0] <= self.indices[-1] <= 255:
+            raise ValueError("indices must be a non-empty set of palette entries 0-255")
+
+        self.colors = [tuple(self.palette[i * 3:i * 3 + 3]) for i in range(256)]
+        self.cube = None
+        self._memo = {}
+        self._root = self._build_tree(list(self.indices), 0)
+
+    @classmethod
+    def from_file(cls, filename: str, use_cube: bool = False, cube_filename: str = None, indices=None):
+        """
+        Builds an index from a palette file.
+
+        Args:
+            filename: Path to a palette.lmp (or any format palette.py reads).
+            use_cube: Load (or build and save) the RGB cube. Ignored when
+                NumPy is not installed.
+            cube_filename: Where the cube is kept (default: next to the
+                palette, with a .cube extension).
+            indices: Palette entries lookups may return (default: all).
+        """
+        index = cls(read_palette(filename), indices)
+
+        if use_cube and np is not None:
+            index.load_cube(cube_filename or os.path.splitext(filename)[0] + CUBE_EXTENSION)
+
+        return index
+
+    # --- k-d tree ---
+
+    def _build_tree(self, indices, axis):
+        if not indices:
+            return None
+
+        indices.sort(key=lambda i: (self.colors[i][axis], i))
+        mid = len(indices) // 2
+        next_axis = (axis + 1) % 3
+
+        return (
+            indices[mid],
+            self.colors[indices[mid]],
+            axis,
+            self._build_tree(indices[:mid], next_axis),
+            self._build_tree(indices[mid + 1:], next_axis),
+        )
+
+    def _search(self, node, rgb, best):
+        index, color, axis, left, right = node
+
+        dr = rgb[0] - color[0]
+        dg = rgb[1] - color[1]
+        db = rgb[2] - color[2]
+        dist = dr * dr + dg * dg + db * db
+
+        if dist < best[0] or (dist == best[0] and index < best[1]):
+            best[0] = dist
+            best[1] = index
+
+        diff = rgb[axis] - color[axis]
+        near, far = (left, right) if diff < 0 else (right, left)
+
+        if near is not None:
+            self._search(near, rgb, best)
+        # '<=' so that an equally distant, lower index on the far side is still found
+        if far is not None and diff * diff <= best[0]:
+            self._search(far, rgb, best)
+
+    def lookup(self, rgb):
+        """
+        Returns the palette index closest to an (r, g, b) color.
+        """
+        key = (rgb[0], rgb[1], rgb[2])
+
+        if self.cube is not None:
+            return int(self.cube[(key[0] << 16) | (key[1] << 8) | key[2]])
+
+        index = self._memo.get(key)
+        if index is None:
+            best = [1 << 30, 256]
+            self._search(self._root, key, best)
+            index = best[1]
+            self._memo[key] = index
+
+        return index
+
+    def quantize(self, rgb_data) -> bytes:
+        """
+        Maps packed 24-bit RGB pixel data to palette indices.
+
+        Args:
+            rgb_data: Bytes-like object of length 3 * num_pixels.
+
+        Returns:
+            One palette index byte per pixel.
+        """
+        if len(rgb_data) % 3:
+            raise ValueError("RGB data length must be a multiple of 3")
+
+        if self.cube is not None:
+            pixels = np.frombuffer(rgb_data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            keys = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+            return self.cube[keys].tobytes()
+
+        data = bytes(rgb_data)
+        lookup = self.lookup
+        return bytes(lookup(data[i:i + 3]) for i in range(0, len(data), 3))
+
+    # --- RGB cube ---
+
+    def build_cube(self):
+        """
+        Solves the full 256^3 RGB->index table with NumPy.
+
+        Returns:
+            The cube as a flat uint8 array indexed by (r << 16) | (g << 8) | b.
+        """
+        if np is None:
+            raise RuntimeError("building the RGB cube requires NumPy")
+
+        pal = np.frombuffer(self.palette, dtype=np.uint8).reshape(256, 3).astype(np.int32)
+
+        # Per-cell candidate pruning. An entry can only be nearest to some
+        # point of a cell if its minimum distance to the cell is no greater
+        # than the smallest maximum distance of any entry to that cell.
+        lo = np.arange(_CELLS_PER_AXIS, dtype=np.int32) * _CELL
+        hi = lo + _CELL - 1
+        below = np.maximum(lo[:, None] - pal.T[:, None, :], 0)   # (3, cells, 256)
+        above = np.maximum(pal.T[:, None, :] - hi[:, None], 0)
+        near_axis = (below + above) ** 2
+        far_axis = np.maximum((pal.T[:, None, :] - lo[:, None]) ** 2,
+                              (pal.T[:, None, :] - hi[:, None]) ** 2)
+
+        dmin = (near_axis[0][:, None, None, :] + near_axis[1][None, :, None, :]
+                + near_axis[2][None, None, :, :]).reshape(-1, 256)
+        dmax = (far_axis[0][:, None, None, :] + far_axis[1][None, :, None, :]
+                + far_axis[2][None, None, :, :]).reshape(-1, 256)
+        excluded = np.ones(256, dtype=bool)
+        excluded[self.indices] = False
+        dmin[:, excluded] = 1 << 30
+        dmax[:, excluded] = 1 << 30
+        candidates = dmin <= dmax.min(axis=1, keepdims=True)
+
+        # Candidate lists in ascending index order, so argmin keeps the
+        # lowest index on ties. Cells are processed in order of candidate
+        # count, and each chunk is padded only to its own widest list with a
+        # sentinel entry (index 256) that is farther than any real color.
+        counts = candidates.sum(axis=1)
+        order = np.argsort(~candidates, axis=1, kind="stable")
+        padded = np.vstack([pal, np.full((1, 3), 1 << 12, dtype=np.int32)])
+
+        cell_origin = np.stack(np.meshgrid(lo, lo, lo, indexing="ij"), -1).reshape(-1, 3)
+        cells_by_count = np.argsort(counts, kind="stable")
+        best = np.empty((len(cell_origin), _CELL ** 3), dtype=np.uint8)
+        offsets = np.arange(_CELL, dtype=np.int32)
+
+        start = 0
+        while start < len(cells_by_count):
+            # Keep each (cells, 8, 8, 8, width) block to a few million elements
+            chunk = max(1, (1 << 22) // (_CELL ** 3 * int(counts[cells_by_count[start]])))
+            cells = cells_by_count[start:start + chunk]
+            width = int(counts[cells].max())
+
+            cand = order[cells, :width]
+            cand[np.arange(width)[None, :] >= counts[cells][:, None]] = 256
+            colors = padded[cand]                                   # (n, width, 3)
+
+            # Squared distance splits per channel: each axis term only depends
+            # on that axis' offset inside the cell.
+            axis_point = cell_origin[cells][:, None, :] + offsets[None, :, None]     # (n, 8, 3)
+            axis_dist = (axis_point[:, :, None, :] - colors[:, None, :, :]) ** 2    # (n, 8, width, 3)
+            dist = (axis_dist[:, :, None, None, :, 0]
+                    + axis_dist[:, None, :, None, :, 1]
+                    + axis_dist[:, None, None, :, :, 2])            # (n, 8, 8, 8, width)
+
+            nearest = dist.reshape(len(cells), _CELL ** 3, width).argmin(axis=2)
+            best[cells] = np.take_along_axis(cand, nearest, axis=1)
+            start += len(cells)
+
+        # (cell r, g, b, offset r, g, b) -> (r, g, b)
+        cube = best.reshape((_CELLS_PER_AXIS,) * 3 + (_CELL,) * 3).transpose(0, 3, 1, 4, 2, 5)
+        cube = np.ascontiguousarray(cube).reshape(256, 256, 256)
+
+        self.cube = cube.ravel()
+        return self.cube
+
+    def _cube_header(self):
+        # The palette, then a 256-bit mask of the entries lookups may return
+        mask = bytearray(32)
+        for i in self.indices:
+            mask[i >> 3] |= 1 << (i & 7)
+        return self.palette + bytes(mask)
+
+    def load_cube(self, filename: str):
+        """
+        Loads a persisted cube, or builds and saves it if the file is
+        missing or was made from a different palette.
+        """
+        header = self._cube_header()
+        try:
+            with open(filename, "rb") as f:
+                if f.read(len(header)) == header:
+                    data = f.read(CUBE_SIZE)
+                    if len(data) == CUBE_SIZE:
+                        self.cube = np.frombuffer(data, dtype=np.uint8)
+                        return self.cube
+        except FileNotFoundError:
+            pass
+
+        self.build_cube()
+        if os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self.save_cube(filename)
+        return self.cube
+
+    def save_cube(self, filename: str):
+        """
+        Writes the cube, prefixed with the palette and entries it was built from.
+        """
+        if self.cube is None:
+            raise RuntimeError("no cube has been built")
+
+        # Written under a temporary name so concurrent readers never see half a cube
+        tmpname = f"{filename}.{os.getpid()}.tmp"
+        with open(tmpname, "wb") as f:
+            f.write(self._cube_header())
+            f.write(self.cube.tobytes())
+        os.replace(tmpname, filename)
+
+def main():
+    """
+    Main function to parse command-line arguments and build palette cubes.
+    """
+    parser = argparse.ArgumentParser(
+        description="Precomputes the RGB->index cube for a Quake .lmp palette."
+    )
+    parser.add_argument(
+        'palette',
+        metavar='palette.lmp',
+        type=str,
+        help='The 768-byte palette to index.'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        help='Cube output path (default: next to the palette, with a .cube extension).'
+    )
+
+    args = parser.parse_args()
+
+    if np is None:
+        print("Error: building the RGB cube requires NumPy (pip install numpy).", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        index = PaletteIndex(read_palette(args.palette))
+    except (IOError, ValueError) as e:
+        print(f"Error reading {args.palette}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    output = args.output or os.path.splitext(args.palette)[0] + CUBE_EXTENSION
+    index.build_cube()
+    index.save_cube(output)
+    print(f"writing {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""
+PIC WAD Compiler
+
+Compiles a set of images (the HUD and menu art in gfx-wad/) into qpic_t
+lumps inside a WAD2 file, replacing 'qpakman -pic *.png'.
+
+Images are quantized to the project palette on a process pool. Each
+worker loads the palette index once, using the precomputed RGB->index
+cube when NumPy is available. Pixels with alpha below 128 become index
+255, Quake's transparent color. A 'conchars' image is stored the way the
+engine expects: raw 128x128 pixels, no header, transparent at index 0.
+
+Usage:
+    picwad.py -p palette.lmp -o gfx.wad [-j N] [--cube palette.cube] *.png
+"""
+
+import sys
+import os
+import argparse
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+# A friendly check for the required Pillow library.
+try:
+    from PIL import Image
+except ImportError:
+    print(
+        "Error: The 'Pillow' library is required to run this script.",
+        file=sys.stderr
+    )
+    print("Please install it using: pip install Pillow", file=sys.stderr)
+    sys.exit(1)
+
+from palindex import PaletteIndex, np
+from wad2 import WAD2Writer, TYP_QPIC, TYP_MIPTEX
+
+QPIC_HEADER = struct.Struct("<2l")
+TRANSPARENT_INDEX = 255
+CONCHARS_SIZE = (128, 128)
+
+# Per-worker palette index, set up by _init_worker
+_index = None
+
+def _init_worker(palette_filename, cube_filename):
+    global _index
+    _index = PaletteIndex.from_file(palette_filename, use_cube=cube_filename is not None,
+                                    cube_filename=cube_filename)
+
+def quantize_image(index, img, transparent=TRANSPARENT_INDEX):
+    """
+    Converts a Pillow image to palette indices.
+
+    Args:
+        index: The PaletteIndex to quantize against.
+        img: Any Pillow image; it is converted to RGBA first.
+        transparent: Index written for pixels with alpha below 128.
+
+    Returns:
+        One index byte per pixel, row by row.
+    """
+    rgba = img.convert("RGBA").tobytes()
+
+    if np is not None and index.cube is not None:
+        pixels = np.frombuffer(rgba, dtype=np.uint8).reshape(-1, 4)
+        indices = np.frombuffer(index.quantize(pixels[:, :3].tobytes()), dtype=np.uint8).copy()
+        indices[pixels[:, 3] < 128] = transparent
+        return indices.tobytes()
+
+    lookup = index.lookup
+    return bytes(
+        transparent if rgba[i + 3] < 128 else lookup(rgba[i:i + 3])
+        for i in range(0, len(rgba), 4)
+    )
+
+def compile_pic(filename, index=None):
+    """
+    Builds the WAD lump for one image file.
+
+    Returns:
+        (lump name, lump type, lump data)
+    """
+    index = index or _index
+    name = os.path.splitext(os.path.basename(filename))[0].lower()
+
+    with Image.open(filename) as img:
+        if name == "conchars":
+            if img.size != CONCHARS_SIZE:
+                raise ValueError(f"{filename}: conchars must be {CONCHARS_SIZE[0]}x{CONCHARS_SIZE[1]}")
+            return name, TYP_MIPTEX, quantize_image(index, img, transparent=0)
+
+        data = QPIC_HEADER.pack(img.width, img.height) + quantize_image(index, img)
+        return name, TYP_QPIC, data
+
+def compile_wad(files, palette_filename, wad_filename, jobs=None, cube_filename=None):
+    """
+    Compiles image files into a WAD2 of qpic lumps, in parallel.
+
+    Args:
+        files: Image paths; lump names are the lowercased file names
+            without extension.
+        palette_filename: The 768-byte palette.lmp to quantize against.
+        wad_filename: The WAD file to write.
+        jobs: Worker processes (default: all cores).
+        cube_filename: Where to keep the precomputed RGB cube, or None to
+            use the k-d tree only.
+
+    Returns:
+        The list of lump names written, in WAD order.
+    """
+    if cube_filename is not None and np is not None:
+        # Build the cube once up front instead of in every worker
+        PaletteIndex.from_file(palette_filename, use_cube=True, cube_filename=cube_filename)
+
+    # Sorted so the same inputs always give the same WAD
+    files = sorted(files, key=lambda path: os.path.basename(path).lower())
+
+    if jobs == 1 or len(files) < 2:
+        index = PaletteIndex.from_file(palette_filename, use_cube=cube_filename is not None,
+                                       cube_filename=cube_filename)
+        lumps = [compile_pic(path, index) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(palette_filename, cube_filename)) as pool:
+            lumps = list(pool.map(compile_pic, files))
+
+    with WAD2Writer(wad_filename) as wad:
+        for name, type, data in lumps:
+            wad.add_lump(name, data, type)
+
+    return [name for name, _, _ in lumps]
+
+def main():
+    """
+    Main function to parse command-line arguments and compile the WAD.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compiles images into a WAD2 of Quake qpic lumps (e.g. gfx.wad)."
+    )
+    parser.add_argument('files', metavar='image.png', nargs='+', help='Images to compile.')
+    parser.add_argument('-p', '--palette', required=True, help='The palette.lmp to quantize against.')
+    parser.add_argument('-o', '--output', default='gfx.wad', help='WAD file to write (default: gfx.wad).')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--cube', help='Where to keep the precomputed RGB->index cube (needs NumPy).')
+
+    args = parser.parse_args()
+
+    try:
+        names = compile_wad(args.files, args.palette, args.output, args.jobs, args.cube)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {len(names)} pics to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+
+"""
+progs.dat Profiler
+
+Memory-mapped reader for compiled QuakeC (progs.dat, version 6) and a
+static profile of what it contains:
+
+- every function's size in statements, and the statements reachable
+  through its static calls (a bound on the work one call can do)
+- the static call graph; calls through function variables (self.th_run()
+  and the like) can't be resolved and are counted as indirect
+- how often each builtin is called, by call site
+- the think functions (those stored in .think or an AI th_* field, or
+  named by a [frame, function] state) ranked by size: with many monsters
+  awake, these run every server frame
+- counts checked against the limits of the id compiler and engines
+
+Usage:
+    progsfile.py [--json] [--top N] [--graph] [progs.dat]
+"""
+
+import sys
+import os
+import argparse
+import json
+import mmap
+import struct
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROGS = os.path.join(ROOT, "_pak0", "progs.dat")
+
+PROG_VERSION = 6
+PROGHEADER_CRC = 5927  # CRC of the system globals in the engine's progdefs.h
+
+# dprograms_t, dstatement_t, ddef_t and dfunction_t (pr_comp.h)
+PROGS_HEADER = struct.Struct("<15i")
+DSTATEMENT = struct.Struct("<Hhhh")
+DDEF = struct.Struct("<HHi")
+DFUNCTION = struct.Struct("<7i8B")
+
+DEF_SAVEGLOBAL = 1 << 15
+EV_FIELD = 5
+EV_FUNCTION = 6
+
+OP_CALL0 = 51
+OP_CALL8 = 59
+OP_STATE = 60
+OP_ADDRESS = 30
+OP_STOREP_FNC = 42
+
+# Entity fields holding functions the engine or AI runs every frame
+THINK_FIELDS = ("think", "th_stand", "th_walk", "th_run", "th_missile", "th_melee")
+
+# Limits of the id qcc (qcc.h) that stock engines and tools assume
+LIMITS = {
+    "statements": 65536,
+    "functions": 8192,
+    "globals": 16384,
+    "fields": 1024,
+    "strings": 500000,
+}
+
+class ProgsFile:
+    """
+    A memory-mapped, read-only progs.dat.
+
+    Raises:
+        ValueError: If the file is not a well-formed version 6 progs.dat.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size < PROGS_HEADER.size:
+                raise ValueError(f"{filename} is too small to be a progs.dat")
+
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        (self.version, self.crc,
+         ofs_statements, num_statements, ofs_globaldefs, num_globaldefs,
+         ofs_fielddefs, num_fielddefs, ofs_functions, num_functions,
+         ofs_strings, num_strings, ofs_globals, num_globals,
+         self.entityfields) = PROGS_HEADER.unpack_from(self._map, 0)
+
+        if self.version != PROG_VERSION:
+            raise ValueError(f"{self.filename} is progs version {self.version}, not {PROG_VERSION}")
+
+        self.sections = {
+            "statements": (ofs_statements, num_statements, DSTATEMENT.size),
+            "globaldefs": (ofs_globaldefs, num_globaldefs, DDEF.size),
+            "fielddefs": (ofs_fielddefs, num_fielddefs, DDEF.size),
+            "functions": (ofs_functions, num_functions, DFUNCTION.size),
+            "strings": (ofs_strings, num_strings, 1),
+            "globals": (ofs_globals, num_globals, 4),
+        }
+        for name, (offset, count, record) in self.sections.items():
+            if offset < 0 or count < 0 or offset + count * record > self.size:
+                raise ValueError(f"{self.filename}: the {name} section points outside the file")
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def count(self, name):
+        return self.sections[name][1]
+
+    def _section(self, name):
+        offset, count, record = self.sections[name]
+        return self._map[offset:offset + count * record]
+
+    def statements(self):
+        """
+        Returns every statement as an (op, a, b, c) tuple.
+        """
+        return list(DSTATEMENT.iter_unpack(self._section("statements")))
+
+    def functions(self):
+        return list(DFUNCTION.iter_unpack(self._section("functions")))
+
+    def globaldefs(self):
+        return list(DDEF.iter_unpack(self._section("globaldefs")))
+
+    def globals_int(self):
+        """
+        Returns the global values read as integers (function and string
+        references are stored that way).
+        """
+        data = self._section("globals")
+        return struct.unpack(f"<{len(data) // 4}i", data)
+
+    def string(self, offset):
+        """
+        Returns the string at an offset in the string table.
+        """
+        start, length, _ = self.sections["strings"]
+        if not 0 <= offset < length:
+            return ""
+        end = self._map.find(b"\x00", start + offset, start + length)
+        return self._map[start + offset:end if end >= 0 else start + length].decode("latin-1")
+
+class Function:
+    """
+    One QuakeC function and its static profile.
+
+    Attributes:
+        builtin: The builtin number, or 0 for QuakeC code.
+        statements: Its statement count.
+        calls: {callee function index: call sites}.
+        indirect_calls: Call sites through function variables.
+    """
+    __slots__ = ("index", "name", "file", "first_statement", "builtin", "statements",
+                 "calls", "indirect_calls")
+
+    def __init__(self, index, name, file, first_statement):
+        self.index = index
+        self.name = name
+        self.file = file
+        self.first_statement = first_statement
+        self.builtin = -first_statement if first_statement < 0 else 0
+        self.statements = 0
+        self.calls = {}
+        self.indirect_calls = 0
+
+class ProgsProfile:
+    """
+    The static profile of a progs.dat.
+
+    Attributes:
+        functions: Every Function, indexed as in the file (0 is unused).
+        thinks: Indices of the functions used as think functions.
+    """
+
+    def __init__(self, progs):
+        self.filename = progs.filename
+        self.size = progs.size
+        self.crc = progs.crc
+        self.counts = {name: progs.count(name) for name in progs.sections}
+        self.counts["fields"] = self.counts.pop("fielddefs")
+        self.entityfields = progs.entityfields
+
+        self.functions = [Function(i, progs.string(f[4]), progs.string(f[5]), f[0])
+                          for i, f in enumerate(progs.functions())]
+        statements = progs.statements()
+        values = progs.globals_int()
+
+        # Globals that are function constants, and globals naming fields
+        function_globals = {}
+        field_names = {}
+        for kind, ofs, name in progs.globaldefs():
+            kind &= ~DEF_SAVEGLOBAL
+            if kind == EV_FUNCTION and ofs < len(values) and 0 < values[ofs] < len(self.functions):
+                function_globals[ofs] = values[ofs]
+            elif kind == EV_FIELD:
+                field_names[ofs] = progs.string(name)
+
+        # A function runs from its first statement to the next function's
+        starts = sorted((f.first_statement, f.index) for f in self.functions if f.first_statement > 0)
+        ends = [start for start, _ in starts[1:]] + [len(statements)]
+
+        self.thinks = set()
+        for (start, index), end in zip(starts, ends):
+            function = self.functions[index]
+            function.statements = end - start
+            addressed = {}
+            for op, a, b, c in statements[start:end]:
+                if OP_CALL0 <= op <= OP_CALL8:
+                    callee = function_globals.get(a)
+                    if callee is None:
+                        function.indirect_calls += 1
+                    else:
+                        function.calls[callee] = function.calls.get(callee, 0) + 1
+                elif op == OP_STATE and b in function_globals:
+                    self.thinks.add(function_globals[b])
+                elif op == OP_ADDRESS:
+                    # self.think = foo is ADDRESS self, think -> temp;
+                    # STOREP_FNC foo, temp
+                    addressed[c] = field_names.get(b)
+                elif op == OP_STOREP_FNC and a in function_globals and addressed.get(b) in THINK_FIELDS:
+                    self.thinks.add(function_globals[a])
+
+        self._reach = {}
+
+    def reachable_statements(self, index):
+        """
+        Returns the QuakeC statements in a function and everything it can
+        statically call, each function counted once.
+        """
+        if index not in self._reach:
+            seen = {index}
+            stack = [index]
+            while stack:
+                for callee in self.functions[stack.pop()].calls:
+                    if callee not in seen:
+                        seen.add(callee)
+                        stack.append(callee)
+            self._reach[index] = sum(self.functions[i].statements for i in seen)
+        return self._reach[index]
+
+    def builtin_usage(self):
+        """
+        Returns {builtin name: call sites}, most called first.
+        """
+        usage = {}
+        for function in self.functions:
+            for callee, sites in function.calls.items():
+                if self.functions[callee].builtin:
+                    name = self.functions[callee].name
+                    usage[name] = usage.get(name, 0) + sites
+        return dict(sorted(usage.items(), key=lambda item: (-item[1], item[0])))
+
+    def _row(self, function):
+        return {
+            "name": function.name,
+            "file": function.file,
+            "statements": function.statements,
+            "reachable_statements": self.reachable_statements(function.index),
+            "calls": sum(function.calls.values()),
+            "indirect_calls": function.indirect_calls,
+        }
+
+    def report(self, top=20):
+        """
+        Builds the JSON-friendly report, with the top largest functions
+        and think functions.
+        """
+        code = [f for f in self.functions[1:] if not f.builtin]
+        largest = sorted(code, key=lambda f: (-f.statements, f.name))[:top]
+        thinks = sorted((self.functions[i] for i in self.thinks if not self.functions[i].builtin),
+                        key=lambda f: (-self.reachable_statements(f.index), f.name))[:top]
+
+        problems = []
+        if self.crc != PROGHEADER_CRC:
+            problems.append(f"header CRC is {self.crc}, not {PROGHEADER_CRC}: engines will refuse to load it")
+        limits = {}
+        for name, limit in LIMITS.items():
+            value = self.counts[name]
+            limits[name] = {"value": value, "limit": limit, "percent": round(100 * value / limit, 1)}
+            if value > limit:
+                problems.append(f"{name}: {value} exceeds the limit of {limit}")
+
+        return {
+            "file": self.filename,
+            "size": self.size,
+            "crc": self.crc,
+            "counts": self.counts,
+            "entityfields": self.entityfields,
+            "limits": limits,
+            "builtins": sum(1 for f in self.functions if f.builtin),
+            "largest_functions": [self._row(f) for f in largest],
+            "think_functions": [self._row(f) for f in thinks],
+            "builtin_calls": self.builtin_usage(),
+            "problems": problems,
+        }
+
+    def call_graph(self):
+        """
+        Returns {function name: [callee names]} for the QuakeC functions.
+        """
+        return {f.name: sorted(self.functions[c].name for c in f.calls)
+                for f in self.functions[1:] if not f.builtin}
+
+def print_report(report):
+    print(f"{report['file']}: {report['size']} bytes, CRC {report['crc']}")
+    for name, limit in report["limits"].items():
+        print(f"  {name:<12} {limit['value']:>7} / {limit['limit']:<7} {limit['percent']:5.1f}%")
+
+    for title, key in (("Largest functions", "largest_functions"), ("Think functions", "think_functions")):
+        print(f"\n{title} (statements, reachable statements, calls, indirect calls):")
+        for row in report[key]:
+            print(f"  {row['statements']:>6} {row['reachable_statements']:>7} {row['calls']:>5} "
+                  f"{row['indirect_calls']:>4}  {row['name']} ({row['file']})")
+
+    print("\nBuiltin call sites:")
+    for name, sites in report["builtin_calls"].items():
+        print(f"  {sites:>6}  {name}")
+
+    for problem in report["problems"]:
+        print(f"Error: {problem}", file=sys.stderr)
+
+def main():
+    """
+    Main function to parse command-line arguments and print the profile.
+    """
+    parser = argparse.ArgumentParser(
+        description="Reports function sizes, think functions, builtin usage and limits of a progs.dat."
+    )
+    parser.add_argument('progs', nargs='?', default=DEFAULT_PROGS,
+                        help='Path to progs.dat (default: _pak0/progs.dat).')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+    parser.add_argument('--top', type=int, default=20, help='Functions listed per table (default: 20).')
+    parser.add_argument('--graph', action='store_true', help='Print the static call graph instead.')
+
+    args = parser.parse_args()
+
+    try:
+        with ProgsFile(args.progs) as progs:
+            profile = ProgsProfile(progs)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.graph:
+        graph = profile.call_graph()
+        if args.json:
+            print(json.dumps(graph, indent=1))
+        else:
+            for name, callees in graph.items():
+                print(f"{name} -> {', '.join(callees) if callees else '(none)'}")
+        return
+
+    report = profile.report(args.top)
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        print_report(report)
+    if report["problems"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
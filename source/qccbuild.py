@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+QuakeC Build Driver
+
+Compiles qcc-src/ into progs.dat only when something changed. progs.src
+is parsed the way qcc reads it (the first name is the output, the rest
+are the .qc files in compile order, with // and /* */ comments), and the
+cache key covers the compiler binary, its flags, progs.src and every
+listed .qc file. On a hit the cached progs.dat is restored without
+running qcc at all.
+
+Each run reports how long it took, so a compile can be told apart from
+a restore.
+
+Usage:
+    qccbuild.py [-o progs.dat] [--qcc qcc] [--flags "..."] [--no-cache] [progs.src]
+"""
+
+import sys
+import os
+import argparse
+import re
+import shutil
+import subprocess
+import time
+
+from buildcache import BuildCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, cached
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROGS_SRC = os.path.join(ROOT, "qcc-src", "progs.src")
+
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+
+class QCCError(Exception):
+    pass
+
+def parse_progs_src(filename):
+    """
+    Reads a progs.src.
+
+    Returns:
+        (output path, [.qc paths]), both resolved from progs.src's directory.
+
+    Raises:
+        QCCError: If the file lists no output, or a .qc file is missing.
+    """
+    base = os.path.dirname(os.path.abspath(filename))
+    with open(filename, "r") as f:
+        names = [token.strip('"') for token in _COMMENT_RE.sub(" ", f.read()).split()]
+    if not names:
+        raise QCCError(f"{filename} is empty")
+
+    output = os.path.normpath(os.path.join(base, names[0]))
+    sources = [os.path.join(base, name) for name in names[1:]]
+    missing = [name for name, path in zip(names[1:], sources) if not os.path.isfile(path)]
+    if missing:
+        raise QCCError(f"{filename} lists missing files: {', '.join(missing)}")
+    return output, sources
+
+def compile_progs(progs_src, qcc="qcc", flags=""):
+    """
+    Runs qcc in progs.src's directory.
+
+    Returns:
+        qcc's output.
+    """
+    argv = [qcc] + flags.split()
+    try:
+        proc = subprocess.run(argv, cwd=os.path.dirname(os.path.abspath(progs_src)),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except FileNotFoundError:
+        raise QCCError(f"'{qcc}' was not found; is it on your PATH (or in bin/)?")
+
+    output = proc.stdout.decode(errors="replace")
+    if proc.returncode != 0:
+        raise QCCError(f"{' '.join(argv)} exited with status {proc.returncode}\n{output}")
+    return output
+
+def build_progs(progs_src, dest, qcc="qcc", flags="", cache_dir=DEFAULT_CACHE_DIR, cache_size=DEFAULT_MAX_BYTES):
+    """
+    Builds progs.dat into dest, restoring it from the build cache when the
+    compiler, flags and sources all match an earlier compile.
+
+    Returns:
+        (hit, seconds, qcc output): whether the cache was used, the wall
+        time, and the compiler's output ('' on a hit).
+    """
+    start = time.perf_counter()
+    output, sources = parse_progs_src(progs_src)
+    qcc_path = shutil.which(qcc)
+    if qcc_path is None:
+        raise QCCError(f"'{qcc}' was not found; is it on your PATH (or in bin/)?")
+    # qcc runs from progs.src's directory, so a relative path would break
+    qcc_path = os.path.abspath(qcc_path)
+
+    outdir, name = os.path.split(os.path.abspath(dest))
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+
+    def produce():
+        text = compile_progs(progs_src, qcc_path, flags)
+        if not os.path.isfile(output):
+            raise QCCError(f"{qcc} did not write {output}")
+        os.makedirs(outdir, exist_ok=True)
+        if os.path.abspath(output) != os.path.abspath(dest):
+            shutil.move(output, dest)
+        return text
+
+    hit, text = cached(cache, [qcc_path], [progs_src] + sources, outdir, [name], produce, extra=[flags])
+    return hit, time.perf_counter() - start, text or ""
+
+def main():
+    """
+    Main function to parse command-line arguments and build progs.dat.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compiles progs.dat with qcc, skipping the compile when no QuakeC changed."
+    )
+    parser.add_argument('progs_src', nargs='?', default=DEFAULT_PROGS_SRC,
+                        help='Path to progs.src (default: qcc-src/progs.src).')
+    parser.add_argument('-o', '--output', default=None,
+                        help="Where progs.dat goes (default: progs.src's own output path).")
+    parser.add_argument('--qcc', default='qcc', help='The QuakeC compiler (default: qcc).')
+    parser.add_argument('--flags', default='', help='Extra compiler flags.')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Build cache directory.')
+    parser.add_argument('--no-cache', action='store_true', help='Always compile.')
+
+    args = parser.parse_args()
+
+    try:
+        dest = args.output or parse_progs_src(args.progs_src)[0]
+        hit, seconds, text = build_progs(args.progs_src, dest, args.qcc, args.flags,
+                                         None if args.no_cache else args.cache_dir)
+    except (IOError, QCCError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if text:
+        print(text.rstrip())
+    if hit:
+        print(f"{os.path.basename(dest)} unchanged, restored from cache in {seconds:.2f}s")
+    else:
+        print(f"Compiled {os.path.basename(dest)} in {seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
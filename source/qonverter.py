@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+"""
+Qonverter
+
+Converts raw sounds to the format DOSQuake plays: 11025 Hz, mono,
+unsigned 8-bit PCM .wav. It reads the same mapping file as the old
+sound/_RAW/Qonverter.sh, one conversion per line:
+
+    input/path/file.wav=output/path/file.wav
+
+Relative paths are taken from the mapping file's directory. Blank lines
+and lines starting with '#' are skipped.
+
+Everything happens in-process, with no ffmpeg: WAV files are decoded with
+the wave module, downmixed to mono, resampled with a windowed-sinc
+polyphase filter (vectorized with NumPy when it is installed) and
+requantized to 8 bits. Files are converted in parallel, and each output
+is kept in the build cache under a hash of its input, so only new or
+edited sounds are converted again.
+
+Usage:
+    qonverter.py [-j N] [--rate HZ] [--no-cache] [sounds.txt]
+"""
+
+import sys
+import os
+import argparse
+import math
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from buildcache import BuildCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, cached
+from imgbatch import ConvertResult, add_jobs_argument, report
+
+# NumPy is optional; without it the filter runs as a plain Python loop.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MAPPING = os.path.join(ROOT, "sound", "_RAW", "sounds.txt")
+
+QUAKE_SAMPLE_RATE = 11025
+
+# Filter half-length in input (or output, whichever is slower) samples,
+# and the Kaiser window shape: the defaults of scipy's resample_poly
+FILTER_HALF_LENGTH = 10
+KAISER_BETA = 5.0
+
+# Output samples resampled per block, to bound the NumPy gather's memory
+BLOCK_SIZE = 16384
+
+def read_mapping(filename):
+    """
+    Reads a sounds.txt mapping.
+
+    Returns:
+        A list of (input path, output path) pairs.
+    """
+    base = os.path.dirname(os.path.abspath(filename))
+    pairs = []
+    with open(filename, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "=" not in line:
+                raise ValueError(f"{filename}: expected input=output, got '{line}'")
+            source, output = line.split("=", 1)
+            pairs.append((os.path.join(base, source.strip()), os.path.join(base, output.strip())))
+    return pairs
+
+def read_wav(filename):
+    """
+    Decodes a PCM .wav file.
+
+    Returns:
+        (sample rate, mono samples): the channels averaged, as floats in
+        [-1, 1) (a NumPy array, or a list without NumPy).
+
+    Raises:
+        ValueError: If the file is not an 8/16/24/32-bit PCM wave.
+    """
+    try:
+        with wave.open(filename, "rb") as f:
+            rate = f.getframerate()
+            channels = f.getnchannels()
+            width = f.getsampwidth()
+            frames = f.readframes(f.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"{filename} is not a PCM wave file ({e}).")
+
+    if width not in (1, 2, 3, 4):
+        raise ValueError(f"{filename} has {width * 8}-bit samples.")
+
+    frames = frames[:len(frames) - len(frames) % (width * channels)]
+    scale = 1.0 / (1 << (width * 8 - 1))
+
+    if np is not None:
+        if width == 3:
+            # Widen 24-bit samples to 32 bits, low byte zero
+            raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+            wide = np.zeros((len(raw), 4), dtype=np.uint8)
+            wide[:, 1:] = raw
+            samples = wide.view("<i4").ravel().astype(np.float64) * (scale / 256)
+        elif width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float64) - 128) * scale
+        else:
+            samples = np.frombuffer(frames, dtype=f"<i{width}").astype(np.float64) * scale
+        return rate, samples.reshape(-1, channels).mean(axis=1)
+
+    if width == 1:
+        values = [(v - 128) * scale for v in frames]
+    else:
+        values = [int.from_bytes(frames[i:i + width], "little", signed=True) * scale
+                  for i in range(0, len(frames), width)]
+    return rate, [sum(values[i:i + channels]) / channels for i in range(0, len(values), channels)]
+
+def _bessel_i0(x):
+    total, term, k = 1.0, 1.0, 1
+    while term > 1e-12 * total:
+        term *= (x / (2 * k)) ** 2
+        total += term
+        k += 1
+    return total
+
+def design_filter(up, down):
+    """
+    Designs the low-pass filter for resampling by up/down: a Kaiser-windowed
+    sinc at the lower of the two Nyquist rates, with a gain of up.
+
+    Returns:
+        The taps, as a list.
+    """
+    factor = max(up, down)
+    cutoff = 1.0 / factor
+    half = FILTER_HALF_LENGTH * factor
+    norm = _bessel_i0(KAISER_BETA)
+    taps = []
+    for n in range(2 * half + 1):
+        t = n - half
+        sinc = cutoff if t == 0 else math.sin(math.pi * cutoff * t) / (math.pi * t)
+        window = _bessel_i0(KAISER_BETA * math.sqrt(1 - (t / half) ** 2)) / norm
+        taps.append(up * sinc * window)
+    return taps
+
+def resample(samples, rate, new_rate):
+    """
+    Resamples by the rational factor new_rate/rate with a polyphase filter.
+    Output sample n is centered on input position n * rate / new_rate.
+
+    Returns:
+        The resampled signal (a NumPy array, or a list without NumPy).
+    """
+    if rate == new_rate or not len(samples):
+        return samples
+
+    g = math.gcd(rate, new_rate)
+    up, down = new_rate // g, rate // g
+    taps = design_filter(up, down)
+    half = len(taps) // 2
+    count = -(-len(samples) * up // down)
+
+    # Phase p of the filter holds taps p, p + up, p + 2*up, ...
+    per_phase = -(-len(taps) // up)
+    phases = [taps[p::up] + [0.0] * (per_phase - len(taps[p::up])) for p in range(up)]
+
+    if np is not None:
+        bank = np.array(phases)
+        # Pad so every window stays inside the signal
+        signal = np.concatenate([np.zeros(per_phase), np.asarray(samples, dtype=np.float64), np.zeros(per_phase)])
+        offsets = np.arange(per_phase)
+        out = np.empty(count)
+        for start in range(0, count, BLOCK_SIZE):
+            pos = np.arange(start, min(start + BLOCK_SIZE, count), dtype=np.int64) * down + half
+            base = pos // up + per_phase
+            windows = signal[base[:, None] - offsets[None, :]]
+            out[start:start + len(pos)] = np.einsum("ij,ij->i", windows, bank[pos % up])
+        return out
+
+    out = []
+    length = len(samples)
+    for n in range(count):
+        pos = n * down + half
+        base = pos // up
+        phase = phases[pos % up]
+        total = 0.0
+        for k in range(per_phase):
+            i = base - k
+            if 0 <= i < length:
+                total += phase[k] * samples[i]
+        out.append(total)
+    return out
+
+def to_pcm_u8(samples):
+    """
+    Requantizes [-1, 1) samples to unsigned 8-bit PCM, clipping overs.
+    """
+    if np is not None:
+        return np.clip(np.round(np.asarray(samples) * 128) + 128, 0, 255).astype(np.uint8).tobytes()
+    return bytes(min(max(int(round(s * 128)) + 128, 0), 255) for s in samples)
+
+def convert_sound(source, output, rate=QUAKE_SAMPLE_RATE):
+    """
+    Converts one sound file to mono, unsigned 8-bit PCM at rate.
+    """
+    source_rate, samples = read_wav(source)
+    data = to_pcm_u8(resample(samples, source_rate, rate))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with wave.open(output, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(1)
+        f.setframerate(rate)
+        f.writeframes(data)
+
+def _convert_pair(rate, cache_dir, cache_size, pair):
+    source, output = pair
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+    outdir, name = os.path.split(os.path.abspath(output))
+    try:
+        cached(cache, [os.path.abspath(__file__)], [source], outdir, [name],
+               partial(convert_sound, source, output, rate), extra=(rate,))
+        return ConvertResult(source, output=output)
+    except FileNotFoundError:
+        return ConvertResult(source, error=f"couldn't find {source}")
+    except (IOError, ValueError) as e:
+        return ConvertResult(source, error=str(e))
+
+def convert_sounds(pairs, rate=QUAKE_SAMPLE_RATE, jobs=None,
+                   cache_dir=DEFAULT_CACHE_DIR, cache_size=DEFAULT_MAX_BYTES):
+    """
+    Converts every (input, output) pair, in parallel, reusing cached
+    outputs unless cache_dir is None.
+
+    Returns:
+        A ConvertResult per pair, in order.
+    """
+    convert = partial(_convert_pair, rate, cache_dir, cache_size)
+    if jobs == 1 or len(pairs) < 2:
+        return [convert(pair) for pair in pairs]
+
+    workers = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(pairs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(convert, pairs, chunksize=chunksize))
+
+def main():
+    """
+    Main function to parse command-line arguments and convert the sounds.
+    """
+    parser = argparse.ArgumentParser(
+        description="Converts the sounds listed in a mapping file to 11 kHz, mono, 8-bit PCM."
+    )
+    parser.add_argument('mapping', nargs='?', default=DEFAULT_MAPPING,
+                        help='The input=output mapping file (default: sound/_RAW/sounds.txt).')
+    parser.add_argument('--rate', type=int, default=QUAKE_SAMPLE_RATE,
+                        help=f'Output sample rate (default: {QUAKE_SAMPLE_RATE}).')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Build cache directory.')
+    parser.add_argument('--no-cache', action='store_true', help='Convert every file, ignoring the cache.')
+    add_jobs_argument(parser)
+
+    args = parser.parse_args()
+
+    try:
+        pairs = read_mapping(args.mapping)
+    except FileNotFoundError:
+        print(f"Error: Data file not found at '{args.mapping}'", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    results = convert_sounds(pairs, args.rate, args.jobs, None if args.no_cache else args.cache_dir)
+    if report(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
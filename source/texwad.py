@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+"""
+Texture WAD Compiler
+
+Turns a directory of source images into a WAD2 of miptex lumps for qbsp,
+with all four mip levels, quantized to the project palette.
+
+Fullbright handling follows colorgen.generate_colormap: the last
+NUM_FULLBRIGHTS palette entries are never dimmed by lighting, so ordinary
+pixels are only ever matched against the lit part of the palette. A pixel
+becomes fullbright only when its source color is exactly one of the
+fullbright palette colors. In the smaller mip levels, a pixel is
+fullbright when at least half of the pixels it covers were.
+
+Mip levels are box-filtered in RGB, and textures are compiled in
+parallel. A manifest next to the WAD records each source's hash, so only
+new or changed images are recompiled; the rest are copied from the
+previous WAD.
+
+File names become texture names. A leading '#' becomes '*' (liquids),
+since '*' can't be used in file names on every system.
+
+Usage:
+    texwad.py -p palette.lmp -o textures.wad [-j N] [--cube path] [--full] srcdir
+"""
+
+import sys
+import os
+import argparse
+import hashlib
+import json
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+# A friendly check for the required Pillow library.
+try:
+    from PIL import Image
+except ImportError:
+    print(
+        "Error: The 'Pillow' library is required to run this script.",
+        file=sys.stderr
+    )
+    print("Please install it using: pip install Pillow", file=sys.stderr)
+    sys.exit(1)
+
+from colorgen import NUM_FULLBRIGHTS
+from makepak import hash_file
+from palindex import PaletteIndex, np
+from wad2 import WAD2File, WAD2Writer, TYP_MIPTEX
+
+MIPTEX_HEADER = struct.Struct("<16s6l")
+MIP_LEVELS = 4
+MIPTEX_NAME_SIZE = 16
+
+FIRST_FULLBRIGHT = 256 - NUM_FULLBRIGHTS
+IMAGE_EXTENSIONS = (".png", ".tga", ".bmp", ".pcx", ".gif", ".jpg", ".jpeg")
+
+# Bump when the compiled output changes, so old manifests are ignored
+TEXWAD_VERSION = 1
+MANIFEST_EXTENSION = ".manifest"
+
+# Per-worker palette indices, set up by _init_worker
+_lit_index = None
+_fullbright_index = None
+
+def _init_worker(palette_filename, cube_filename):
+    global _lit_index, _fullbright_index
+    _lit_index, _fullbright_index = load_indices(palette_filename, cube_filename)
+
+def load_indices(palette_filename, cube_filename=None):
+    """
+    Returns (lit, fullbright) palette indices for a palette file. Only the
+    lit one gets an RGB cube; fullbright pixels are rare.
+    """
+    lit = PaletteIndex.from_file(palette_filename, use_cube=cube_filename is not None,
+                                 cube_filename=cube_filename, indices=range(FIRST_FULLBRIGHT))
+    fullbright = PaletteIndex(lit.palette, indices=range(FIRST_FULLBRIGHT, 256))
+    return lit, fullbright
+
+def texture_name(filename):
+    """
+    Returns the texture name for a source image path.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name.startswith("#"):
+        name = "*" + name[1:]
+    return name
+
+def fullbright_mask(lit_index, img):
+    """
+    Returns an 'L' image that is 255 where a pixel's color is exactly one
+    of the palette's fullbright colors, and 0 elsewhere.
+    """
+    palette = lit_index.palette
+    fullbright_colors = {palette[i * 3:i * 3 + 3] for i in range(FIRST_FULLBRIGHT, 256)}
+    # A lit color identical to a fullbright one is not treated as fullbright
+    fullbright_colors -= {palette[i * 3:i * 3 + 3] for i in range(FIRST_FULLBRIGHT)}
+
+    rgb = img.tobytes()
+    if np is not None:
+        pixels = np.frombuffer(rgb, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        keys = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+        wanted = np.array([(c[0] << 16) | (c[1] << 8) | c[2] for c in fullbright_colors], dtype=np.int32)
+        mask = np.where(np.isin(keys, wanted), 255, 0).astype(np.uint8).tobytes()
+    else:
+        mask = bytes(255 if rgb[i:i + 3] in fullbright_colors else 0 for i in range(0, len(rgb), 3))
+
+    return Image.frombytes("L", img.size, mask)
+
+def quantize_level(lit_index, fullbright_index, rgb_img, mask_img):
+    """
+    Quantizes one mip level: lit colors everywhere, then fullbright colors
+    wherever the mask is at least half set.
+    """
+    rgb = rgb_img.tobytes()
+    mask = mask_img.tobytes()
+    lit = lit_index.quantize(rgb)
+
+    if np is not None:
+        indices = np.frombuffer(lit, dtype=np.uint8).copy()
+        bright = np.frombuffer(mask, dtype=np.uint8) >= 128
+        if bright.any():
+            pixels = np.frombuffer(rgb, dtype=np.uint8).reshape(-1, 3)[bright]
+            indices[bright] = np.frombuffer(fullbright_index.quantize(pixels.tobytes()), dtype=np.uint8)
+        return indices.tobytes()
+
+    indices = bytearray(lit)
+    for i, value in enumerate(mask):
+        if value >= 128:
+            indices[i] = fullbright_index.lookup(rgb[i * 3:i * 3 + 3])
+    return bytes(indices)
+
+def compile_texture(filename, indices=None):
+    """
+    Builds the miptex lump for one source image.
+
+    Returns:
+        (texture name, lump data)
+    """
+    lit_index, fullbright_index = indices or (_lit_index, _fullbright_index)
+    name = texture_name(filename)
+
+    if len(name.encode("ascii")) >= MIPTEX_NAME_SIZE:
+        raise ValueError(f"{filename}: texture name '{name}' is longer than {MIPTEX_NAME_SIZE - 1} characters")
+
+    with Image.open(filename) as source:
+        img = source.convert("RGB")
+
+    if img.width % 16 or img.height % 16 or not img.width or not img.height:
+        raise ValueError(f"{filename}: texture size {img.width}x{img.height} is not a multiple of 16")
+
+    mask = fullbright_mask(lit_index, img)
+
+    # Every level is box-filtered straight from the full-size image
+    levels = []
+    for level in range(MIP_LEVELS):
+        factor = 1 << level
+        level_rgb = img.reduce(factor) if factor > 1 else img
+        level_mask = mask.reduce(factor) if factor > 1 else mask
+        levels.append(quantize_level(lit_index, fullbright_index, level_rgb, level_mask))
+
+    offsets = []
+    offset = MIPTEX_HEADER.size
+    for data in levels:
+        offsets.append(offset)
+        offset += len(data)
+
+    header = MIPTEX_HEADER.pack(name.encode("ascii"), img.width, img.height, *offsets)
+    return name, header + b"".join(levels)
+
+def collect_sources(srcdir):
+    """
+    Returns {texture name: path} for every image under srcdir.
+    """
+    sources = {}
+    seen = set()
+    for root, subFolders, files in os.walk(srcdir):
+        for file in files:
+            if not file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, file)
+            name = texture_name(path)
+            if name.lower() in seen:
+                raise ValueError(f"two source images are both named '{name}' ({path})")
+            seen.add(name.lower())
+            sources[name] = path
+    return sources
+
+def load_manifest(wad_filename, palette):
+    """
+    Returns {texture name: source sha1} for the textures in an existing WAD
+    that were compiled by this version against this palette, or {}.
+    """
+    try:
+        with open(wad_filename + MANIFEST_EXTENSION, "r") as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+    if manifest.get("version") != TEXWAD_VERSION or \
+            manifest.get("palette") != hashlib.sha1(palette).hexdigest() or \
+            not os.path.isfile(wad_filename):
+        return {}
+    return manifest["textures"]
+
+def compile_wad(srcdir, palette_filename, wad_filename, jobs=None, cube_filename=None, full=False):
+    """
+    Compiles every image under srcdir into a texture WAD, reusing lumps
+    from the previous build for unchanged sources.
+
+    Returns:
+        (number of textures compiled, number reused)
+    """
+    lit_index, fullbright_index = load_indices(palette_filename, cube_filename)
+    sources = collect_sources(srcdir)
+    hashes = {name: hash_file(path) for name, path in sources.items()}
+
+    previous = {} if full else load_manifest(wad_filename, lit_index.palette)
+    stale = sorted(name for name in sources if previous.get(name) != hashes[name])
+
+    if jobs == 1 or len(stale) < 2:
+        compiled = dict(compile_texture(sources[name], (lit_index, fullbright_index)) for name in stale)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(palette_filename, cube_filename)) as pool:
+            compiled = dict(pool.map(compile_texture, [sources[name] for name in stale]))
+
+    old_wad = WAD2File(wad_filename) if len(compiled) < len(sources) else None
+    tmpname = wad_filename + ".tmp"
+    try:
+        with WAD2Writer(tmpname) as wad:
+            for name in sorted(sources, key=str.lower):
+                if name in compiled:
+                    wad.add_lump(name, compiled[name], TYP_MIPTEX)
+                else:
+                    with old_wad.read(name) as data:
+                        wad.add_lump(name, data, TYP_MIPTEX)
+    finally:
+        if old_wad is not None:
+            old_wad.close()
+    os.replace(tmpname, wad_filename)
+
+    manifest = {
+        "version": TEXWAD_VERSION,
+        "palette": hashlib.sha1(lit_index.palette).hexdigest(),
+        "textures": hashes,
+    }
+    tmpname = wad_filename + MANIFEST_EXTENSION + ".tmp"
+    with open(tmpname, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmpname, wad_filename + MANIFEST_EXTENSION)
+
+    return len(compiled), len(sources) - len(compiled)
+
+def main():
+    """
+    Main function to parse command-line arguments and compile the WAD.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compiles a directory of images into a Quake texture WAD with mipmaps."
+    )
+    parser.add_argument('srcdir', help='Directory of source images.')
+    parser.add_argument('-p', '--palette', required=True, help='The palette.lmp to quantize against.')
+    parser.add_argument('-o', '--output', required=True, help='Texture WAD to write.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--cube', help='Where to keep the precomputed RGB->index cube (needs NumPy).')
+    parser.add_argument('--full', action='store_true', help='Recompile every texture.')
+
+    args = parser.parse_args()
+
+    try:
+        compiled, reused = compile_wad(args.srcdir, args.palette, args.output,
+                                       args.jobs, args.cube, args.full)
+    except (IOError, KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {compiled + reused} textures to {args.output} ({compiled} compiled, {reused} unchanged)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+"""
+WAD2 Library
+
+Headless reading and writing of Quake WAD2 archives (gfx.wad and texture
+WADs), without the Tkinter editor in lmpwad.py.
+
+WAD2File memory-maps an archive and indexes its 32-byte directory, so a
+lump is found by name in O(1) and returned as a zero-copy memoryview.
+WAD2Writer streams lumps to disk as they are added and writes the
+directory once at the end. Every lump carries its own type code.
+
+Usage:
+    wad2.py list gfx.wad
+    wad2.py extract gfx.wad [-o outdir] [name ...]
+    wad2.py create out.wad [--type 0x42] file.lmp ...
+"""
+
+import sys
+import os
+import argparse
+import mmap
+import struct
+
+from makepak import copy_file_data, write_all
+
+WAD2_MAGIC = b"WAD2"
+WAD2_HEADER = struct.Struct("<4s2l")
+WAD2_ENTRY = struct.Struct("<3l2Bh16s")
+WAD2_NAME_SIZE = 16
+
+# Lump type codes (wad.h)
+TYP_NONE = 0x00
+TYP_LABEL = 0x01
+TYP_LUMPY = 0x40
+TYP_PALETTE = 0x40
+TYP_QTEX = 0x41
+TYP_QPIC = 0x42
+TYP_SOUND = 0x43
+TYP_MIPTEX = 0x44
+
+CMP_NONE = 0
+
+def clean_name(name):
+    """
+    Normalizes a lump name the way the engine's W_CleanupName does:
+    lowercase, at most 16 characters.
+    """
+    return name.lower()[:WAD2_NAME_SIZE]
+
+def guess_lump_type(name):
+    """
+    Picks a lump type for a gfx.wad entry from its name. Everything that
+    isn't the palette or the console font is a qpic.
+    """
+    name = clean_name(name)
+    if name == "palette":
+        return TYP_PALETTE
+    if name == "conchars":
+        return TYP_MIPTEX
+    return TYP_QPIC
+
+class WAD2Lump:
+    """
+    One directory entry of a WAD2 file.
+    """
+    __slots__ = ("name", "offset", "disksize", "size", "type", "compression")
+
+    def __init__(self, name, offset, disksize, size, type, compression=CMP_NONE):
+        self.name = name
+        self.offset = offset
+        self.disksize = disksize
+        self.size = size
+        self.type = type
+        self.compression = compression
+
+class WAD2File:
+    """
+    A memory-mapped, read-only WAD2 archive.
+
+    Args:
+        filename: Path to the WAD file.
+
+    Raises:
+        ValueError: If the file is not a well-formed WAD2 archive.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < WAD2_HEADER.size:
+                raise ValueError(f"{filename} is too small to be a WAD2 file")
+
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+            self._read_directory(size)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_directory(self, size):
+        magic, count, dir_offset = WAD2_HEADER.unpack_from(self._map, 0)
+        if magic != WAD2_MAGIC:
+            raise ValueError(f"{self.filename} is not a WAD2 file")
+        if count < 0 or dir_offset < 0 or dir_offset + count * WAD2_ENTRY.size > size:
+            raise ValueError(f"{self.filename} has a corrupt directory")
+
+        self.lumps = []
+        self._lookup = {}
+
+        dir_end = dir_offset + count * WAD2_ENTRY.size
+        for offset, disksize, lumpsize, type, compression, _, name in \
+                WAD2_ENTRY.iter_unpack(self._view[dir_offset:dir_end]):
+            name = name.split(b"\x00", 1)[0].decode("ascii")
+            if offset < 0 or disksize < 0 or offset + disksize > size:
+                raise ValueError(f"{self.filename}: lump '{name}' points outside the file")
+
+            lump = WAD2Lump(name, offset, disksize, lumpsize, type, compression)
+            self._lookup.setdefault(clean_name(name), lump)
+            self.lumps.append(lump)
+
+    def close(self):
+        """
+        Releases the mapping. Slices handed out by read() must be released first.
+        """
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.lumps)
+
+    def __contains__(self, name):
+        return clean_name(name) in self._lookup
+
+    def __iter__(self):
+        return iter(self.lumps)
+
+    def lump(self, name: str) -> WAD2Lump:
+        """
+        Returns the directory entry for a lump name (case-insensitive).
+
+        Raises:
+            KeyError: If there is no such lump.
+        """
+        return self._lookup[clean_name(name)]
+
+    def read(self, name) -> memoryview:
+        """
+        Returns a lump's contents as a zero-copy slice of the mapping.
+
+        Args:
+            name: A lump name or a WAD2Lump from this file.
+        """
+        lump = name if isinstance(name, WAD2Lump) else self.lump(name)
+        if lump.compression != CMP_NONE:
+            raise ValueError(f"lump '{lump.name}' is compressed, which is not supported")
+        return self._view[lump.offset:lump.offset + lump.disksize]
+
+class WAD2Writer:
+    """
+    Writes a WAD2 archive lump by lump. Lump data goes straight to disk,
+    and the directory and header are written by close().
+
+    Args:
+        filename: Path of the WAD file to create.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lumps = []
+        self._names = set()
+        self._file = open(filename, "wb", buffering=0)
+        write_all(self._file, WAD2_HEADER.pack(WAD2_MAGIC, 0, 0))
+        self._offset = WAD2_HEADER.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+    def _begin(self, name, type):
+        # Names keep their case; the engine compares them case-insensitively.
+        name = name[:WAD2_NAME_SIZE]
+        if not name:
+            raise ValueError("lump names can't be empty")
+        if clean_name(name) in self._names:
+            raise ValueError(f"duplicate lump name '{name}'")
+        if not 0 <= type <= 0xFF:
+            raise ValueError(f"lump type {type} is out of range")
+        name.encode("ascii")  # raises on names the engine couldn't store
+        self._names.add(clean_name(name))
+        return name
+
+    def _finish(self, name, type, size):
+        self.lumps.append(WAD2Lump(name, self._offset, size, size, type))
+        self._offset += size
+
+        # Keep every lump 4-byte aligned, as qlumpy does
+        padding = -self._offset % 4
+        if padding:
+            write_all(self._file, bytes(padding))
+            self._offset += padding
+
+    def add_lump(self, name, data, type=TYP_QPIC):
+        """
+        Adds a lump from an in-memory buffer.
+        """
+        name = self._begin(name, type)
+        write_all(self._file, data)
+        self._finish(name, type, len(data))
+
+    def add_file(self, name, path, type=TYP_QPIC):
+        """
+        Adds a lump from a file on disk, copied without loading it whole.
+        """
+        name = self._begin(name, type)
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            copy_file_data(f, self._file, size)
+        self._finish(name, type, size)
+
+    def close(self):
+        """
+        Writes the directory and header, and closes the file.
+        """
+        if self._file is None:
+            return
+
+        directory = bytearray(WAD2_ENTRY.size * len(self.lumps))
+        for i, lump in enumerate(self.lumps):
+            WAD2_ENTRY.pack_into(directory, i * WAD2_ENTRY.size, lump.offset, lump.disksize,
+                                 lump.size, lump.type, lump.compression, 0, lump.name.encode("ascii"))
+        write_all(self._file, directory)
+
+        self._file.seek(0)
+        write_all(self._file, WAD2_HEADER.pack(WAD2_MAGIC, len(self.lumps), self._offset))
+        self._file.close()
+        self._file = None
+
+def main():
+    """
+    Main function to parse command-line arguments and run a subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        description="Lists, extracts and creates Quake WAD2 files."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_cmd = commands.add_parser('list', help='List the lumps of a WAD2 file.')
+    list_cmd.add_argument('wadfile', help='The WAD file to read.')
+
+    extract_cmd = commands.add_parser('extract', help='Extract lumps to .lmp files.')
+    extract_cmd.add_argument('wadfile', help='The WAD file to read.')
+    extract_cmd.add_argument('names', nargs='*', help='Lumps to extract (default: all).')
+    extract_cmd.add_argument('-o', '--outdir', default='.', help='Output directory (default: current).')
+
+    create_cmd = commands.add_parser('create', help='Create a WAD2 file from .lmp files.')
+    create_cmd.add_argument('wadfile', help='The WAD file to write.')
+    create_cmd.add_argument('files', nargs='+', help='Lump files; the lump name is the file name without extension.')
+    create_cmd.add_argument('-t', '--type', type=lambda v: int(v, 0),
+                            help='Lump type code for every lump, e.g. 0x42 (default: guessed from the name).')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'list':
+            with WAD2File(args.wadfile) as wad:
+                for lump in wad:
+                    print(f"{lump.offset:10d} {lump.disksize:8d}  0x{lump.type:02x}  {lump.name}")
+                print(f"{len(wad)} lumps")
+
+        elif args.command == 'extract':
+            os.makedirs(args.outdir, exist_ok=True)
+            with WAD2File(args.wadfile) as wad:
+                for lump in [wad.lump(name) for name in args.names] or wad.lumps:
+                    path = os.path.join(args.outdir, lump.name + ".lmp")
+                    with wad.read(lump) as data, open(path, "wb") as f:
+                        f.write(data)
+                    print(f"writing {path}")
+
+        elif args.command == 'create':
+            with WAD2Writer(args.wadfile) as wad:
+                for path in args.files:
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    type = args.type if args.type is not None else guess_lump_type(name)
+                    wad.add_file(name, path, type)
+            print(f"Wrote {len(args.files)} lumps to {args.wadfile}")
+
+    except KeyError as e:
+        print(f"Error: {args.wadfile} has no lump {e}", file=sys.stderr)
+        sys.exit(1)
+    except (IOError, ValueError) as e:
+        print(f"Error: {args.wadfile}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
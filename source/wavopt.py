@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+"""
+WAV Optimizer
+
+Shrinks the sounds that go into the PAK without changing how they play:
+
+- leading and trailing silence is trimmed (at least one sample is kept)
+- only the chunks the engine reads are kept: 'fmt ', 'data', and the
+  'cue ' chunk plus the first 'LIST' chunk after it, which hold a looping
+  sound's loop start and length (snd_mem.c GetWavinfo); everything else
+  ('fact', 'smpl', other 'LIST' tags, 'JUNK', ...) is dropped
+
+Looping sounds are trimmed with care: leading silence is only cut up to
+the loop start, and the cue positions are moved back to match. Trailing
+silence is only cut past the end of the loop, since the loop runs to the
+end of the data when there's no loop length.
+
+Files are rewritten in place. Anything that isn't 8 or 16-bit PCM (which
+is all the engine plays) is left alone.
+
+Usage:
+    wavopt.py [-n] [--threshold N] [-j N] sound_dir_or_file ...
+"""
+
+import sys
+import os
+import argparse
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from imgbatch import add_jobs_argument
+
+CHUNK_HEADER = struct.Struct("<4sI")
+FMT = struct.Struct("<HHIIHH")
+CUE_POINT = struct.Struct("<II4sIII")
+
+# Chunks the engine reads, besides the LIST after 'cue '
+KEEP_CHUNKS = (b"fmt ", b"data", b"cue ")
+
+# Default silence threshold, in 8-bit sample steps
+DEFAULT_THRESHOLD = 1
+
+class WavChunk:
+    __slots__ = ("id", "data")
+
+    def __init__(self, chunk_id, data):
+        self.id = chunk_id
+        self.data = data
+
+def read_chunks(filename):
+    """
+    Reads a RIFF WAVE file chunk by chunk, seeking past the bodies of the
+    chunks the engine never reads.
+
+    Returns:
+        (kept chunks, dropped chunk ids).
+
+    Raises:
+        ValueError: If the file is not a RIFF WAVE.
+    """
+    kept, dropped = [], []
+    seen_cue = seen_list = False
+    with open(filename, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"{filename} is not a RIFF WAVE file.")
+
+        while True:
+            chunk_header = f.read(CHUNK_HEADER.size)
+            if len(chunk_header) < CHUNK_HEADER.size:
+                break
+            chunk_id, size = CHUNK_HEADER.unpack(chunk_header)
+            padded = size + (size & 1)
+
+            # The engine only looks at the first LIST after the cue chunk
+            if chunk_id == b"LIST":
+                keep = seen_cue and not seen_list
+                seen_list = seen_list or seen_cue
+            else:
+                keep = chunk_id in KEEP_CHUNKS
+                seen_cue = seen_cue or chunk_id == b"cue "
+
+            if keep:
+                data = f.read(size)
+                if len(data) < size and chunk_id != b"data":
+                    raise ValueError(f"{filename}: the '{chunk_id.decode('latin-1')}' chunk is truncated.")
+                kept.append(WavChunk(chunk_id, data))
+                f.seek(padded - size, 1)
+            else:
+                dropped.append(chunk_id.decode("latin-1"))
+                f.seek(padded, 1)
+
+    return kept, dropped
+
+def _first_loud(samples, threshold, start, stop, step):
+    for i in range(start, stop, step):
+        if abs(samples[i]) > threshold:
+            return i
+    return None
+
+def find_sound(data, width, channels, threshold):
+    """
+    Finds the frames between the leading and trailing silence.
+
+    Returns:
+        (first frame, end frame); both 0 for an all-silent sound.
+    """
+    if width == 1:
+        # Unsigned 8-bit: silence is 128
+        samples = _Centered8(data)
+    elif sys.byteorder == "little":
+        samples = memoryview(data[:len(data) - len(data) % 2]).cast("h")
+        threshold *= 256
+    else:
+        samples = _Swapped16(data)
+        threshold *= 256
+
+    count = len(samples) - len(samples) % channels
+    first = _first_loud(samples, threshold, 0, count, 1)
+    if first is None:
+        return 0, 0
+    last = _first_loud(samples, threshold, count - 1, first - 1, -1)
+    return first // channels, last // channels + 1
+
+class _Centered8:
+    """
+    Signed view of unsigned 8-bit samples.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i] - 128
+
+class _Swapped16:
+    """
+    Little-endian 16-bit samples on a big-endian machine.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data) // 2
+
+    def __getitem__(self, i):
+        return int.from_bytes(self.data[i * 2:i * 2 + 2], "little", signed=True)
+
+def loop_info(chunks):
+    """
+    Returns (loop start, loop length) the way the engine reads them: the
+    first cue point's sample offset, and the length from a 'mark' label in
+    the adtl list after the cue chunk. Either is None if missing.
+    """
+    loop_start = loop_length = None
+    seen_cue = False
+    for chunk in chunks:
+        if chunk.id == b"cue " and len(chunk.data) >= 4 + CUE_POINT.size:
+            loop_start = CUE_POINT.unpack_from(chunk.data, 4)[5]
+            seen_cue = True
+        elif chunk.id == b"LIST" and seen_cue:
+            # 'adtl', then a 'ltxt' sub-chunk: cue id, sample length, purpose
+            if chunk.data[20:24] == b"mark":
+                loop_length = struct.unpack_from("<I", chunk.data, 16)[0]
+            break
+    return loop_start, loop_length
+
+def _shift_cues(data, frames):
+    # Moves every cue point back by the frames trimmed from the front
+    count = struct.unpack_from("<I", data, 0)[0]
+    out = bytearray(data)
+    for i in range(count):
+        offset = 4 + i * CUE_POINT.size
+        if offset + CUE_POINT.size > len(data):
+            break
+        name, position, chunk, chunk_start, block_start, sample = CUE_POINT.unpack_from(data, offset)
+        CUE_POINT.pack_into(out, offset, name, max(position - frames, 0), chunk, chunk_start,
+                            block_start, max(sample - frames, 0))
+    return bytes(out)
+
+def optimize_wav(filename, threshold=DEFAULT_THRESHOLD, dry_run=False):
+    """
+    Trims silence and drops unused chunks from one WAV file, in place.
+
+    Returns:
+        (bytes before, bytes after, note); note says why a file was left
+        alone, or lists the dropped chunks.
+    """
+    before = os.path.getsize(filename)
+    chunks, dropped = read_chunks(filename)
+    by_id = {}
+    for chunk in chunks:
+        # Like the engine, use the first of each
+        by_id.setdefault(chunk.id, chunk)
+    if b"fmt " not in by_id or b"data" not in by_id:
+        return before, before, "no fmt or data chunk, left alone"
+
+    fmt_tag, channels, _, _, _, bits = FMT.unpack_from(by_id[b"fmt "].data)
+    width = bits // 8
+    if fmt_tag != 1 or width not in (1, 2) or not channels:
+        return before, before, "not 8/16-bit PCM, left alone"
+
+    data = by_id[b"data"].data
+    frames = len(data) // (width * channels)
+    first, end = find_sound(data, width, channels, threshold)
+    if end == 0:
+        first, end = 0, min(frames, 1)
+
+    loop_start, loop_length = loop_info(chunks)
+    if loop_start is not None:
+        first = min(first, loop_start)
+        end = max(end, min(loop_start + loop_length, frames) if loop_length is not None else frames)
+
+    frame_size = width * channels
+    for chunk in chunks:
+        if chunk is by_id[b"data"]:
+            chunk.data = data[first * frame_size:end * frame_size]
+        elif chunk.id == b"cue " and first:
+            chunk.data = _shift_cues(chunk.data, first)
+
+    body = bytearray(b"WAVE")
+    for chunk in chunks:
+        body += CHUNK_HEADER.pack(chunk.id, len(chunk.data)) + chunk.data
+        if len(chunk.data) & 1:
+            body += b"\x00"
+    output = CHUNK_HEADER.pack(b"RIFF", len(body)) + body
+
+    trimmed = frames - (end - first)
+    notes = []
+    if trimmed:
+        notes.append(f"trimmed {trimmed} of {frames} frames")
+    if dropped:
+        notes.append(f"dropped {', '.join(dropped)}")
+
+    if len(output) < before and not dry_run:
+        tmpname = filename + ".tmp"
+        with open(tmpname, "wb") as f:
+            f.write(output)
+        os.replace(tmpname, filename)
+    return before, min(len(output), before), "; ".join(notes)
+
+def find_wavs(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                found += [os.path.join(dirpath, name) for name in names if name.lower().endswith(".wav")]
+        else:
+            found.append(path)
+    return sorted(found)
+
+def _optimize_one(threshold, dry_run, filename):
+    try:
+        return filename, optimize_wav(filename, threshold, dry_run), None
+    except (IOError, ValueError, struct.error) as e:
+        return filename, None, str(e)
+
+def main():
+    """
+    Main function to parse command-line arguments and optimize the sounds.
+    """
+    parser = argparse.ArgumentParser(
+        description="Trims silence and unused chunks from Quake .wav sounds, in place."
+    )
+    parser.add_argument('paths', nargs='+', help='.wav files, or directories to search.')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Report the savings without writing.')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f'Largest sample still counted as silence, in 8-bit steps (default: {DEFAULT_THRESHOLD}).')
+    add_jobs_argument(parser)
+
+    args = parser.parse_args()
+
+    files = find_wavs(args.paths)
+    work = [(args.threshold, args.dry_run, filename) for filename in files]
+    if args.jobs == 1 or len(files) < 2:
+        results = [_optimize_one(*item) for item in work]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_optimize_one, *zip(*work), chunksize=max(1, len(files) // 32)))
+
+    total_before = total_after = failed = 0
+    for filename, sizes, error in results:
+        if error:
+            print(f"Error: {error}", file=sys.stderr)
+            failed += 1
+            continue
+        before, after, note = sizes
+        total_before += before
+        total_after += after
+        if before != after:
+            print(f"{filename}: {before} -> {after} bytes, saved {before - after} ({note})")
+
+    print(f"{len(files)} sounds, {total_before} -> {total_after} bytes, "
+          f"saved {total_before - total_after}{' (dry run)' if args.dry_run else ''}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()